@@ -0,0 +1,263 @@
+# benchmark.py - Load generator and benchmark for the e-commerce Redis paths
+import argparse
+import importlib.util
+import json
+import os
+import random
+import sys
+import threading
+import time
+from redis_engine import RedisEngine, RedisSettings
+
+# The e-commerce module's file name is not importable with a plain import
+spec = importlib.util.spec_from_file_location(
+    "ecommerce",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "beyond-cache-implementation.py")
+)
+ecommerce = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(ecommerce)
+
+ADJECTIVES = ["Wireless", "Portable", "Smart", "Premium", "Compact", "Waterproof", "Ergonomic", "Digital"]
+NOUNS = ["Headphones", "Speaker", "Watch", "Keyboard", "Camera", "Charger", "Monitor", "Tablet"]
+
+class LatencyRecorder:
+    """Collects per-operation latencies and errors from many threads"""
+
+    def __init__(self):
+        self.samples = {}
+        self.errors = {}
+        self.lock = threading.Lock()
+
+    def record(self, operation, seconds):
+        with self.lock:
+            self.samples.setdefault(operation, []).append(seconds)
+
+    def error(self, operation):
+        with self.lock:
+            self.errors[operation] = self.errors.get(operation, 0) + 1
+
+    def timed(self, operation, func, *args):
+        """Run func, recording its latency or an error under operation"""
+        start = time.perf_counter()
+        try:
+            result = func(*args)
+        except Exception:
+            self.error(operation)
+            return None
+        self.record(operation, time.perf_counter() - start)
+        return result
+
+    def report(self, duration):
+        """Throughput and p50/p95/p99 latency per operation"""
+        operations = {}
+        for operation in sorted(set(self.samples) | set(self.errors)):
+            samples = sorted(self.samples.get(operation, []))
+            operations[operation] = {
+                "count": len(samples),
+                "errors": self.errors.get(operation, 0),
+                "throughput_per_s": round(len(samples) / duration, 1),
+                "p50_ms": percentile(samples, 50),
+                "p95_ms": percentile(samples, 95),
+                "p99_ms": percentile(samples, 99),
+                "max_ms": percentile(samples, 100)
+            }
+        return operations
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of sorted samples, in milliseconds"""
+    if not samples:
+        return None
+    rank = max(0, min(len(samples) - 1, int(round(pct / 100 * len(samples))) - 1))
+    return round(samples[rank] * 1000, 3)
+
+def product_id(n):
+    return f"B{n:07d}"
+
+def synthetic_catalog(count, stock):
+    """Generate catalog rows with searchable names"""
+    for n in range(count):
+        yield {
+            "id": product_id(n),
+            "name": f"{random.choice(ADJECTIVES)} {random.choice(NOUNS)} {n}",
+            "description": f"{random.choice(ADJECTIVES)} benchmark product",
+            "price": round(random.uniform(5, 500), 2),
+            "inventory": stock
+        }
+
+class TimedOrderProcessor(ecommerce.OrderProcessor):
+    """OrderProcessor that records batch and end-to-end fulfilment latency"""
+
+    def __init__(self, recorder, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.recorder = recorder
+
+    def process_batch(self, messages, stream=ecommerce.ORDER_STREAM):
+        start = time.perf_counter()
+        super().process_batch(messages, stream)
+        self.recorder.record("order_batch", time.perf_counter() - start)
+
+        # Stream ids carry the submit time in milliseconds
+        now_ms = time.time() * 1000
+        for message_id, _ in messages:
+            self.recorder.record("order_end_to_end", (now_ms - int(message_id.split("-")[0])) / 1000)
+
+def run_benchmark(args):
+    settings = RedisSettings(args.host, args.port, cluster=args.cluster, order_shards=args.order_shards)
+    redis_client = settings.connect()
+    if redis_client.dbsize() and not args.flush:
+        sys.exit("Refusing to run against a non-empty database; pass --flush to clear it first")
+    if args.flush:
+        redis_client.flushdb()
+
+    recorder = LatencyRecorder()
+    engine = RedisEngine(settings=settings, max_concurrency=args.concurrency)
+
+    # Seed the catalog through the bulk importer
+    ecommerce.create_products_index(redis_client)
+    start = time.perf_counter()
+    ecommerce.CatalogImporter(redis_client, batch_size=1000, report=lambda msg: None).import_rows(
+        synthetic_catalog(args.products, args.stock)
+    )
+    seed_seconds = time.perf_counter() - start
+
+    # One full paged catalog scan, as load_products does at startup
+    recorder.timed("load_products", lambda: sum(
+        len(page) for page in engine.iter_product_pages(ecommerce.PRODUCT_PAGE_SIZE)
+    ))
+
+    stop = threading.Event()
+
+    intake = ecommerce.OrderIntake(
+        redis_client,
+        client_rate=args.client_rate,
+        client_burst=args.client_rate * 2,
+        max_backlog=args.max_backlog,
+        settings=settings
+    ) if args.intake else None
+
+    def producer():
+        client_id = f"bench-{threading.get_ident()}"
+        while not stop.is_set():
+            order_id = os.urandom(6).hex()
+            lines = [(product_id(random.randrange(args.products)), random.randint(1, 3))]
+            if intake is None:
+                recorder.timed("order_submit", redis_client.xadd, settings.order_stream(order_id), {
+                    "order_id": order_id,
+                    "product_id": lines[0][0],
+                    "quantity": lines[0][1],
+                    "status": "pending"
+                })
+                continue
+
+            result = recorder.timed("order_submit", intake.submit, client_id, lines, order_id)
+            if result and result["status"] != "accepted":
+                # Count refusals and honour the hint, as a well-behaved client would
+                recorder.error(f"order_{result['status']}")
+                stop.wait(result["retry_after_ms"] / 1000)
+
+    def searcher():
+        while not stop.is_set():
+            term = random.choice(ADJECTIVES + NOUNS)
+            recorder.timed("search_products", engine.call, engine.search_products(term))
+
+    def updater():
+        added = 0
+        while not stop.is_set():
+            if random.random() < args.add_ratio:
+                added += 1
+                pid = f"N{threading.get_ident() % 10000:04d}{added:07d}"
+                recorder.timed("add_product", engine.call, engine.add_product(
+                    pid, f"{random.choice(ADJECTIVES)} {random.choice(NOUNS)}", "added by benchmark",
+                    round(random.uniform(5, 500), 2), args.stock
+                ))
+            else:
+                pid = product_id(random.randrange(args.products))
+                recorder.timed("update_product", engine.call, engine.update_product(
+                    pid, {"inventory": random.randint(args.stock // 2, args.stock)}
+                ))
+
+    processor = TimedOrderProcessor(
+        recorder,
+        redis_client,
+        workers=args.workers,
+        batch_size=args.batch_size,
+        block_ms=200,
+        settings=settings
+    )
+    processor.start()
+
+    threads = (
+        [threading.Thread(target=producer) for _ in range(args.producers)] +
+        [threading.Thread(target=searcher) for _ in range(args.searchers)] +
+        [threading.Thread(target=updater) for _ in range(args.updaters)]
+    )
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    time.sleep(args.duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    duration = time.perf_counter() - start
+
+    # Let the processors drain what the producers submitted
+    deadline = time.monotonic() + args.drain_timeout
+    while time.monotonic() < deadline:
+        groups = [
+            next(g for g in redis_client.xinfo_groups(stream) if g["name"] == ecommerce.ORDER_GROUP)
+            for stream in settings.order_streams()
+        ]
+        if all(group["pending"] == 0 and (group.get("lag") or 0) == 0 for group in groups):
+            break
+        time.sleep(0.1)
+    processor.stop()
+    engine.close()
+
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "config": vars(args),
+        "seed_seconds": round(seed_seconds, 3),
+        "seed_rows_per_s": round(args.products / seed_seconds, 1) if seed_seconds else None,
+        "duration_s": round(duration, 3),
+        "orders_processed": processor.processed,
+        "operations": recorder.report(duration)
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the e-commerce Redis paths against a local redis-stack server")
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=6379)
+    parser.add_argument("--cluster", action="store_true",
+                        help="treat --host/--port as a seed node of a Redis Cluster")
+    parser.add_argument("--order-shards", type=int, default=1,
+                        help="spread orders over this many hash-tagged streams (default: 1)")
+    parser.add_argument("--intake", action="store_true",
+                        help="submit orders through the rate-limited OrderIntake instead of raw XADD")
+    parser.add_argument("--client-rate", type=int, default=1000,
+                        help="orders per second per producer with --intake (default: 1000)")
+    parser.add_argument("--max-backlog", type=int, default=10000,
+                        help="unprocessed orders per stream before --intake defers new ones (default: 10000)")
+    parser.add_argument("--flush", action="store_true",
+                        help="FLUSHDB before seeding (required if the database is not empty)")
+    parser.add_argument("--products", type=int, default=10000, help="synthetic catalog size (default: 10000)")
+    parser.add_argument("--stock", type=int, default=1000000, help="initial stock per product (default: 1000000)")
+    parser.add_argument("--duration", type=float, default=30, help="seconds of mixed load (default: 30)")
+    parser.add_argument("--producers", type=int, default=2, help="order producer threads (default: 2)")
+    parser.add_argument("--workers", type=int, default=4, help="order processor worker threads (default: 4)")
+    parser.add_argument("--batch-size", type=int, default=50, help="orders per XREADGROUP call (default: 50)")
+    parser.add_argument("--searchers", type=int, default=2, help="search client threads (default: 2)")
+    parser.add_argument("--updaters", type=int, default=2, help="product update client threads (default: 2)")
+    parser.add_argument("--add-ratio", type=float, default=0.1,
+                        help="share of updater operations that add a product (default: 0.1)")
+    parser.add_argument("--concurrency", type=int, default=16, help="engine concurrency limit (default: 16)")
+    parser.add_argument("--drain-timeout", type=float, default=10,
+                        help="seconds to wait for pending orders after the load stops (default: 10)")
+    parser.add_argument("--output", help="write the JSON report to this file instead of stdout")
+    args = parser.parse_args()
+
+    report = json.dumps(run_benchmark(args), indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(report + "\n")
+    else:
+        print(report)
@@ -1,13 +1,939 @@
 # beyond-cache-ui.py - Complete E-Commerce System with Redis Backend
 import tkinter as tk
 from tkinter import ttk, messagebox, simpledialog
-from redis import Redis
+from redis.exceptions import NoScriptError, ResponseError
 from redis.commands.search.field import TextField, NumericField
-from redis.commands.search.query import Query
+from redis.commands.search.indexDefinition import IndexDefinition, IndexType
+import argparse
+import csv
 import json
+import math
+import os
+import queue
+import socket
 import threading
+import time
 import uuid
+from collections import OrderedDict
 from datetime import datetime
+from metrics import REGISTRY
+from snapshot import CatalogSnapshot
+from redis_engine import (
+    RedisEngine, SETTINGS, ORDER_STREAM, ORDER_STATUS_STREAM, SYSTEM_LOG_STREAM, SYSTEM_LOG_MAXLEN,
+    is_cluster, slot_of, product_document, bump_catalog_version,
+    record_sales, SALES_RECORDED_TTL, PRICE_FACET_WIDTH, SUGGEST_KEY, SUGGEST_REFS_KEY, SUGGEST_COUNT, update_suggestion
+)
+
+# Bump whenever the products index schema changes so it is rebuilt on start
+PRODUCTS_INDEX_VERSION = "3"
+
+# Number of products fetched per SCAN/JSON.MGET round trip
+PRODUCT_PAGE_SIZE = 500
+
+# Maximum number of product documents held by the in-process cache
+PRODUCT_CACHE_SIZE = 10000
+
+# Order streams: producers append to ORDER_STREAM (or its shards, see
+# RedisSettings.order_streams), processors report to ORDER_STATUS_STREAM
+ORDER_GROUP = "order_processors"
+ORDER_STATUS_MAXLEN = 100000
+
+# Per-order order:<id> status hashes expire after this many seconds
+ORDER_RECORD_TTL = 86400
+
+# Order intake: token buckets (orders per second, burst) per client and per product,
+# and the unprocessed backlog per order stream above which new orders are deferred
+CLIENT_RATE = 20
+CLIENT_BURST = 40
+PRODUCT_RATE = 200
+PRODUCT_BURST = 400
+MAX_ORDER_BACKLOG = 10000
+BACKLOG_CHECK_INTERVAL = 0.5
+BACKLOG_RETRY_MS = 1000
+
+# Far above MAX_ORDER_BACKLOG, so trimming only ever drops processed entries
+ORDER_STREAM_MAXLEN = 1000000
+
+# Inventory notifications are coalesced and applied to the UI once per frame
+UI_FRAME_MS = 33
+INVENTORY_LOG_LINES = 500
+LOG_STATS_INTERVAL_MS = 2000
+
+# Operations shown in the live latency summary
+METRICS_SUMMARY = ("load_products", "search", "order_fulfilment", "ui_frame")
+
+# The live order feed keeps this many rows; older ones are paged in on demand
+ORDER_FEED_ROWS = 200
+ORDER_FEED_BATCH = 100
+ORDER_HISTORY_PAGE = 50
+
+# Sales dashboard: leaderboard size, rolling window and refresh period
+SALES_TOP_N = 10
+SALES_WINDOW_MINUTES = 5
+SALES_REFRESH_MS = 5000
+
+# Autocomplete waits this long after the last keystroke before asking Redis
+SUGGEST_DEBOUNCE_MS = 150
+
+# Sort choices offered by the search filters: label -> (field, ascending)
+SEARCH_SORT_OPTIONS = {
+    "Relevance": (None, True),
+    "Price ↑": ("price", True),
+    "Price ↓": ("price", False),
+    "Stock ↑": ("inventory", True),
+    "Stock ↓": ("inventory", False)
+}
+
+# Reservation results are kept this long so a redelivered order is not charged twice
+RESERVATION_TTL = 86400
+
+# Atomically reserve stock for every line of an order, all-or-nothing.
+# KEYS[1] is the order's reservation marker, KEYS[2..n] the product documents;
+# ARGV[1] is the marker TTL and ARGV[2..n] the quantity for each line.
+# Returns one {status, stock} pair per line where status is "reserved",
+# "released" (in stock, but another line failed), "insufficient", "missing"
+# or "invalid" (a quantity is not a positive integer) and stock is the level
+# after the call. Nothing is decremented unless every line can be reserved.
+RESERVE_STOCK_SCRIPT = """
+local previous = redis.call('GET', KEYS[1])
+if previous then
+    return cjson.decode(previous)
+end
+
+-- A zero or negative quantity would raise stock instead of reserving it
+for i = 2, #KEYS do
+    local quantity = tonumber(ARGV[i])
+    if not quantity or quantity < 1 or quantity ~= math.floor(quantity) then
+        local results = {}
+        for j = 2, #KEYS do
+            results[j - 1] = {'invalid', 0}
+        end
+        return results
+    end
+end
+
+local stock = {}
+local needed = {}
+local ok = true
+for i = 2, #KEYS do
+    local key = KEYS[i]
+    if stock[key] == nil then
+        local current = redis.call('JSON.GET', key, '$.inventory')
+        stock[key] = current and cjson.decode(current)[1] or false
+    end
+    needed[key] = (needed[key] or 0) + tonumber(ARGV[i])
+    if not stock[key] or stock[key] < needed[key] then
+        ok = false
+    end
+end
+
+local results = {}
+for i = 2, #KEYS do
+    local key = KEYS[i]
+    if not stock[key] then
+        results[i - 1] = {'missing', 0}
+    elseif not ok then
+        results[i - 1] = {stock[key] >= needed[key] and 'released' or 'insufficient', stock[key]}
+    else
+        local remaining = redis.call('JSON.NUMINCRBY', key, '$.inventory', -tonumber(ARGV[i]))
+        results[i - 1] = {'reserved', cjson.decode(remaining)[1]}
+    end
+end
+
+if ok then
+    redis.call('SET', KEYS[1], cjson.encode(results), 'EX', ARGV[1])
+end
+return results
+"""
+
+# Undo a reservation made by RESERVE_STOCK_SCRIPT with the same KEYS and ARGV,
+# used on a cluster when another slot's lines of the same order failed. Only a
+# marker still recording a reservation is released, so retries are harmless.
+# Returns the marker's per-line results, now with status "released".
+RELEASE_STOCK_SCRIPT = """
+local previous = redis.call('GET', KEYS[1])
+if not previous then
+    return {}
+end
+local results = cjson.decode(previous)
+if results[1][1] ~= 'reserved' then
+    return results
+end
+
+for i = 2, #KEYS do
+    local stock = 0
+    if redis.call('EXISTS', KEYS[i]) == 1 then
+        stock = cjson.decode(redis.call('JSON.NUMINCRBY', KEYS[i], '$.inventory', tonumber(ARGV[i])))[1]
+    end
+    results[i - 1] = {'released', stock}
+end
+redis.call('SET', KEYS[1], cjson.encode(results), 'EX', ARGV[1])
+return results
+"""
+
+# Take ARGV[3] tokens from the bucket at KEYS[1], refilled at ARGV[1] tokens per
+# second up to ARGV[2]. Returns {1, 0} when taken, or {0, ms until enough tokens}.
+TAKE_TOKENS_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local time = redis.call('TIME')
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(bucket[1]) or burst
+local ts = tonumber(bucket[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate / 1000)
+
+local allowed, retry_after = 0, 0
+if tokens >= cost then
+    tokens = tokens - cost
+    allowed = 1
+else
+    retry_after = math.ceil((cost - tokens) * 1000 / rate)
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(burst * 1000 / rate) + 1000)
+return {allowed, retry_after}
+"""
+
+def run_scripts(redis_client, calls):
+    """Run (script, keys, args) calls in one pipeline and return their replies
+
+    Calls are sent as raw EVALSHA commands, which redis-py's cluster
+    pipeline routes by the keys' slot (it refuses evalsha() and Script
+    calls). A failed call's reply is its exception. Calls refused with
+    NOSCRIPT, e.g. after a server restart, are resent once with their
+    script loaded again.
+    """
+    replies = [None] * len(calls)
+    pending = list(range(len(calls)))
+    for attempt in range(2):
+        with redis_client.pipeline(transaction=False) as pipe:
+            for i in pending:
+                script, keys, args = calls[i]
+                pipe.execute_command("EVALSHA", script.sha, len(keys), *keys, *args)
+            for i, reply in zip(pending, pipe.execute(raise_on_error=False)):
+                replies[i] = reply
+        pending = [i for i in pending if isinstance(replies[i], NoScriptError)]
+        if not pending or attempt:
+            break
+        for script in {calls[i][0].script for i in pending}:
+            redis_client.script_load(script)
+    return replies
+
+def validate_lines(lines):
+    """Check that an order has lines, each with a product and a positive quantity"""
+    if not lines:
+        raise ValueError("order has no items")
+    for pid, quantity in lines:
+        if not pid:
+            raise ValueError("order line has no product_id")
+        if quantity < 1:
+            raise ValueError(f"quantity for {pid} must be positive, got {quantity}")
+    return lines
+
+def order_lines(order):
+    """Return the (product_id, quantity) lines of an order stream entry
+
+    Raises KeyError, TypeError or ValueError for a malformed entry.
+    """
+    if "items" in order:
+        return validate_lines([(item["product_id"], int(item["quantity"])) for item in json.loads(order["items"])])
+    return validate_lines([(order["product_id"], int(order["quantity"]))])
+
+def catalog_row(row):
+    """Return the (id, name, description, price, inventory) of one catalog import row
+
+    Raises ValueError naming the first missing or malformed field.
+    """
+    if not isinstance(row, dict):
+        raise ValueError("not a JSON object")
+    pid = str(row.get("id") or "").strip()
+    if not pid:
+        raise ValueError("missing id")
+    name = str(row.get("name") or "").strip()
+    if not name:
+        raise ValueError("missing name")
+    price = row.get("price")
+    try:
+        price = float(price)
+    except (TypeError, ValueError):
+        raise ValueError(f"price must be a number, got {price!r}") from None
+    if not math.isfinite(price) or price < 0:
+        raise ValueError(f"price must be a non-negative number, got {row['price']!r}")
+    inventory = row.get("inventory")
+    if isinstance(inventory, float) and inventory.is_integer():
+        inventory = int(inventory)
+    if isinstance(inventory, bool) or not isinstance(inventory, (int, str)):
+        raise ValueError(f"inventory must be a whole number, got {inventory!r}")
+    try:
+        inventory = int(inventory)
+    except ValueError:
+        raise ValueError(f"inventory must be a whole number, got {row['inventory']!r}") from None
+    if inventory < 0:
+        raise ValueError(f"inventory must not be negative, got {inventory}")
+    return pid, name, str(row.get("description") or ""), price, inventory
+
+def connect_redis():
+    """Create the Redis (or RedisCluster) client shared by the UI and the headless tools"""
+    return SETTINGS.connect()
+
+def create_products_index(redis_client):
+    """Index the product JSON documents directly under the product: prefix"""
+    schema = (
+        TextField("$.name", as_name="name"),
+        TextField("$.description", as_name="description"),
+        NumericField("$.price", as_name="price", sortable=True),
+        NumericField("$.inventory", as_name="inventory", sortable=True)
+    )
+    redis_client.ft("products").create_index(
+        schema,
+        definition=IndexDefinition(prefix=["product:"], index_type=IndexType.JSON)
+    )
+    redis_client.set("system:products_index_version", PRODUCTS_INDEX_VERSION)
+
+def build_suggestions(redis_client, engine):
+    """Rebuild the autocomplete dictionary and its name counts from the existing catalog"""
+    redis_client.unlink(SUGGEST_KEY, SUGGEST_REFS_KEY)
+    added = 0
+    for page in engine.iter_product_pages(PRODUCT_PAGE_SIZE):
+        with redis_client.pipeline(transaction=False) as pipe:
+            for pid, product_data in page:
+                update_suggestion(pipe, pid, None, product_data["name"])
+            pipe.execute()
+        added += len(page)
+    return added
+
+# Product Cache =============================================
+
+class ProductCache:
+    """Size-bounded LRU cache of product documents kept coherent by invalidations
+
+    Only CLIENT TRACKING reports every write to a product key, whoever makes
+    it. Without it (on a cluster, or on servers that lack it) nothing is
+    cached, since no other channel is told about every write.
+    """
+
+    def __init__(self, redis_client, max_size=PRODUCT_CACHE_SIZE):
+        self.redis = redis_client
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        
+        # Bumped on every invalidation so reads racing one are not cached
+        self.generation = 0
+        self.mode = "disabled"
+        self.tracking_connection = None
+
+    def lookup(self, pids):
+        """Split pids into cached documents and misses, noting the generation"""
+        found = {}
+        missing = []
+        with self.lock:
+            for pid in pids:
+                doc = self.entries.get(pid)
+                if doc is None:
+                    missing.append(pid)
+                else:
+                    self.entries.move_to_end(pid)
+                    found[pid] = doc
+            self.hits += len(found)
+            self.misses += len(missing)
+            return found, missing, self.generation
+
+    def store(self, fetched, generation):
+        """Cache documents read from Redis unless an invalidation raced the read"""
+        # Without tracking nothing would invalidate these entries
+        if self.mode != "tracking":
+            return
+        with self.lock:
+            if generation != self.generation:
+                return
+            self.entries.update(fetched)
+            for pid in fetched:
+                self.entries.move_to_end(pid)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def invalidate(self, pids):
+        """Drop cached documents, e.g. right after writing them locally"""
+        with self.lock:
+            self.generation += 1
+            for pid in pids:
+                self.entries.pop(pid, None)
+
+    def invalidate_all(self):
+        """Drop every cached document"""
+        with self.lock:
+            self.generation += 1
+            self.entries.clear()
+
+    def summary(self):
+        """Hit/miss counters formatted for the status bar"""
+        total = self.hits + self.misses
+        ratio = (self.hits / total * 100) if total > 0 else 0
+        return f"Product cache: {self.hits}/{total} hits ({ratio:.1f}%), {len(self.entries)} cached, {self.mode}"
+
+    def start_invalidation_listener(self):
+        """Listen for invalidations in a background thread"""
+        thread = threading.Thread(target=self.listen, daemon=True)
+        thread.start()
+
+    def subscribe(self):
+        """Subscribe to tracking invalidations; returns None where tracking is unavailable"""
+        if is_cluster(self.redis):
+            # Tracking redirects are per node connection
+            self.mode = "off (cluster)"
+            return None
+        pubsub = self.redis.pubsub()
+        try:
+            # The pubsub connection is the redirect target, so take its id before subscribing
+            pubsub.connection = self.redis.connection_pool.get_connection("CLIENT")
+            pubsub.connection.send_command("CLIENT", "ID")
+            client_id = pubsub.connection.read_response()
+            pubsub.subscribe("__redis__:invalidate")
+            
+            # Tracking state belongs to the connection that enables it, so keep one aside
+            if self.tracking_connection is not None:
+                self.tracking_connection.disconnect()
+            self.tracking_connection = self.redis.connection_pool.make_connection()
+            self.tracking_connection.send_command(
+                "CLIENT", "TRACKING", "ON", "REDIRECT", client_id, "BCAST", "PREFIX", "product:"
+            )
+            self.tracking_connection.read_response()
+            self.mode = "tracking"
+        except Exception as e:
+            # inventory_updates only covers stock changes made by this app, so it cannot stand in
+            print(f"Client tracking unavailable, product cache disabled: {str(e)}")
+            pubsub.close()
+            self.mode = "off (no client tracking)"
+            return None
+        return pubsub
+
+    def listen(self):
+        """Apply invalidation messages, resubscribing after connection loss"""
+        while True:
+            try:
+                pubsub = self.subscribe()
+                if pubsub is None:
+                    return
+                for message in pubsub.listen():
+                    if message["type"] != "message":
+                        continue
+                    # A null payload means the whole keyspace was flushed
+                    if message["data"] is None:
+                        self.invalidate_all()
+                    else:
+                        self.invalidate([key.split(":", 1)[1] for key in message["data"]])
+            except Exception as e:
+                print(f"Product cache invalidation error: {str(e)}")
+            
+            # Invalidations may have been missed while disconnected
+            self.mode = "disabled"
+            self.invalidate_all()
+            time.sleep(1)
+
+# Catalog Import ============================================
+
+class CatalogImporter:
+    """Stream a CSV or JSONL catalog into Redis in pipelined batches"""
+
+    def __init__(self, redis_client, batch_size=1000, report=print):
+        self.redis = redis_client
+        self.batch_size = batch_size
+        self.report = report
+        self.imported = 0
+        self.created = 0
+        self.skipped = 0
+
+    def import_file(self, path):
+        """Import a .csv file (with a header row) or a .jsonl file"""
+        with open(path, newline="", encoding="utf-8") as f:
+            if path.lower().endswith(".csv"):
+                reader = csv.DictReader(f)
+                rows = ((reader.line_num, row) for row in reader)
+            else:
+                rows = self.jsonl_rows(f)
+            return self.import_numbered_rows(rows)
+
+    def jsonl_rows(self, f):
+        """Yield (line number, row) for each non-blank JSONL line; None for invalid JSON"""
+        for line_num, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                yield line_num, json.loads(line)
+            except ValueError:
+                yield line_num, None
+
+    def import_rows(self, rows):
+        """Import rows with id, name, description, price and inventory keys"""
+        return self.import_numbered_rows(enumerate(rows, 1))
+
+    def import_numbered_rows(self, rows):
+        """Import (line number, row) pairs, skipping and reporting malformed rows"""
+        start = time.monotonic()
+        batch = {}
+        for line_num, row in rows:
+            try:
+                pid, *fields = catalog_row(row)
+            except ValueError as e:
+                row_id = row.get("id") if isinstance(row, dict) else None
+                self.report(f"Skipped line {line_num} (id {row_id!r}): {e}")
+                self.skipped += 1
+                continue
+            # Later rows for the same id win, as they would when written one by one
+            batch[pid] = fields
+            if len(batch) >= self.batch_size:
+                self.write_batch(batch)
+                self.report_progress(start)
+                batch = {}
+        
+        if batch:
+            self.write_batch(batch)
+        self.report_progress(start)
+        return self.imported
+
+    def write_batch(self, batch):
+        """Write one batch of products, the product count and one log entry"""
+        keys = [f"product:{pid}" for pid in batch]
+        # Current names, to move a renamed product's suggestion; None for new products
+        with self.redis.pipeline(transaction=False) as pipe:
+            for key in keys:
+                pipe.json().get(key, "$.name")
+            current = pipe.execute()
+        old_names = [names[0] if names else None for names in current]
+        created = current.count(None)
+        created_at = datetime.now().isoformat()
+        
+        with self.redis.pipeline(transaction=False) as pipe:
+            for key, (name, description, price, inventory) in zip(keys, batch.values()):
+                pipe.json().set(key, "$", product_document(name, description, price, inventory, created_at))
+            for key, (name, *_), old_name in zip(keys, batch.values(), old_names):
+                update_suggestion(pipe, key.split(":", 1)[1], old_name, name)
+            if created:
+                pipe.incrby("system:total_products", created)
+            bump_catalog_version(pipe)
+            pipe.xadd(SYSTEM_LOG_STREAM, {
+                "event": "product_import",
+                "count": len(batch),
+                "created": created,
+                "first_id": next(iter(batch)),
+                "last_id": next(reversed(batch))
+            }, maxlen=SYSTEM_LOG_MAXLEN, approximate=True)
+            pipe.execute()
+        
+        self.imported += len(batch)
+        self.created += created
+
+    def report_progress(self, start):
+        """Report the running import rate"""
+        elapsed = time.monotonic() - start
+        rate = self.imported / elapsed if elapsed > 0 else 0
+        self.report(f"Imported {self.imported} products ({self.created} new, {self.skipped} skipped, {rate:.0f} rows/s)")
+
+# Order Intake ==============================================
+
+class OrderIntake:
+    """Admit orders to the order streams under rate limits and backlog backpressure
+
+    Each order takes one token from its client's bucket and one from each
+    of its products' buckets. Buckets are separate keys checked in one
+    pipelined round trip, so they work on a cluster too; when one bucket
+    refuses, the tokens taken from the others are refunded. While the
+    target stream's unprocessed backlog (consumer group lag plus pending)
+    exceeds max_backlog, orders are refused with a retry-after hint
+    instead of being queued.
+    """
+
+    def __init__(self, redis_client, client_rate=CLIENT_RATE, client_burst=CLIENT_BURST,
+                 product_rate=PRODUCT_RATE, product_burst=PRODUCT_BURST,
+                 max_backlog=MAX_ORDER_BACKLOG, settings=SETTINGS):
+        self.redis = redis_client
+        self.client_limit = (client_rate, client_burst)
+        self.product_limit = (product_rate, product_burst)
+        self.max_backlog = max_backlog
+        self.settings = settings
+        self.take_tokens = redis_client.register_script(TAKE_TOKENS_SCRIPT)
+        # Load the script on every primary up front rather than on the first NOSCRIPT
+        redis_client.script_load(TAKE_TOKENS_SCRIPT)
+        
+        # stream -> (backlog, checked_at); XINFO GROUPS is read at most every BACKLOG_CHECK_INTERVAL
+        self.backlogs = {}
+        self.backlog_lock = threading.Lock()
+
+    def submit(self, client_id, lines, order_id=None):
+        """Submit an order of (product_id, quantity) lines for client_id
+
+        Returns {"status": "accepted", "order_id": ...} or
+        {"status": "rate_limited" | "backlogged", "retry_after_ms": ...}.
+        Raises ValueError for an order without lines or with a quantity below 1.
+        """
+        lines = validate_lines([(pid, int(quantity)) for pid, quantity in lines])
+        order_id = order_id or uuid.uuid4().hex[:12]
+        stream = self.settings.order_stream(order_id)
+        
+        backlog = self.backlog(stream)
+        if backlog > self.max_backlog:
+            return {
+                "status": "backlogged",
+                "retry_after_ms": int(BACKLOG_RETRY_MS * backlog / self.max_backlog)
+            }
+        
+        retry_after = self.take(client_id, [pid for pid, _ in lines])
+        if retry_after:
+            return {"status": "rate_limited", "retry_after_ms": retry_after}
+        
+        entry = {"order_id": order_id, "status": "pending"}
+        if len(lines) == 1:
+            entry["product_id"], entry["quantity"] = lines[0]
+        else:
+            entry["items"] = json.dumps([
+                {"product_id": pid, "quantity": quantity} for pid, quantity in lines
+            ])
+        self.redis.xadd(stream, entry, maxlen=ORDER_STREAM_MAXLEN, approximate=True)
+        return {"status": "accepted", "order_id": order_id}
+
+    def take(self, client_id, pids):
+        """Take a token from every bucket; return 0, or the longest retry-after in ms"""
+        buckets = [(f"ratelimit:client:{client_id}", self.client_limit)]
+        buckets += [(f"ratelimit:product:{pid}", self.product_limit) for pid in dict.fromkeys(pids)]
+        
+        results = run_scripts(self.redis, [
+            (self.take_tokens, [key], [rate, burst, 1]) for key, (rate, burst) in buckets
+        ])
+        for result in results:
+            if isinstance(result, Exception):
+                raise result
+        
+        retry_after = max(result[1] for result in results)
+        if retry_after:
+            # Give back what the refusing bucket's siblings already handed out
+            with self.redis.pipeline(transaction=False) as pipe:
+                for (key, _), (allowed, _) in zip(buckets, results):
+                    if allowed:
+                        pipe.hincrbyfloat(key, "tokens", 1)
+                pipe.execute()
+        return retry_after
+
+    def backlog(self, stream):
+        """Unprocessed entries in stream for the processors' group, cached briefly"""
+        now = time.monotonic()
+        with self.backlog_lock:
+            cached = self.backlogs.get(stream)
+            if cached and now - cached[1] < BACKLOG_CHECK_INTERVAL:
+                return cached[0]
+        
+        try:
+            groups = self.redis.xinfo_groups(stream)
+        except ResponseError:
+            # No stream yet, so nothing is waiting
+            groups = []
+        group = next((g for g in groups if g["name"] == ORDER_GROUP), None)
+        if group is None:
+            # Nothing has consumed this stream yet
+            backlog = self.redis.xlen(stream)
+        else:
+            # lag is only reported by Redis 7+; pending alone is a lower bound
+            backlog = (group.get("lag") or 0) + group["pending"]
+        
+        with self.backlog_lock:
+            self.backlogs[stream] = (backlog, now)
+        return backlog
+
+# Order Processing ==========================================
+
+class OrderProcessor:
+    """Headless consumer-group order processor backed by a pool of worker threads
+
+    Each worker consumes one order stream; with sharded streams at least one
+    worker is started per shard.
+    """
+
+    def __init__(self, redis_client, workers=4, batch_size=50, block_ms=2000,
+                 claim_idle_ms=30000, on_processed=None, settings=SETTINGS):
+        self.redis = redis_client
+        self.cluster = is_cluster(redis_client)
+        self.streams = settings.order_streams()
+        self.workers = max(workers, len(self.streams))
+        self.batch_size = batch_size
+        self.block_ms = block_ms
+        self.claim_idle_ms = claim_idle_ms
+        self.on_processed = on_processed
+        
+        # Consumer names are unique per process so several processes can share the group
+        self.consumer_prefix = f"{socket.gethostname()}-{os.getpid()}"
+        self.stop_event = threading.Event()
+        self.threads = []
+        self.processed = 0
+        self.processed_lock = threading.Lock()
+        self.reserve_stock = redis_client.register_script(RESERVE_STOCK_SCRIPT)
+        self.release_stock = redis_client.register_script(RELEASE_STOCK_SCRIPT)
+        
+        # Sales are counted once per order for as long as a redelivery can follow
+        self.sales_recorded_ttl = max(SALES_RECORDED_TTL, 2 * claim_idle_ms // 1000)
+
+    def ensure_group(self):
+        """Create the consumer group on every order stream, starting from the beginning"""
+        for stream in self.streams:
+            try:
+                self.redis.xgroup_create(stream, ORDER_GROUP, id="0", mkstream=True)
+            except ResponseError as e:
+                if "BUSYGROUP" not in str(e):
+                    raise
+        
+        # Load the scripts on every primary up front rather than on the first NOSCRIPT
+        self.redis.script_load(RESERVE_STOCK_SCRIPT)
+        self.redis.script_load(RELEASE_STOCK_SCRIPT)
+
+    def start(self):
+        """Start the worker threads"""
+        self.ensure_group()
+        for i in range(self.workers):
+            thread = threading.Thread(
+                target=self.run_worker,
+                args=(f"{self.consumer_prefix}-{i}", self.streams[i % len(self.streams)]),
+                daemon=True
+            )
+            thread.start()
+            self.threads.append(thread)
+
+    def stop(self):
+        """Signal the workers to exit and wait for them"""
+        self.stop_event.set()
+        for thread in self.threads:
+            thread.join()
+        self.threads = []
+
+    def run_forever(self, report_interval=5):
+        """Run headless until interrupted, printing throughput periodically"""
+        self.start()
+        last_count, last_time = 0, time.monotonic()
+        try:
+            while not self.stop_event.wait(report_interval):
+                now = time.monotonic()
+                count = self.processed
+                rate = (count - last_count) / (now - last_time)
+                print(f"Processed {count} orders ({rate:.0f}/s) with {self.workers} workers"
+                      f" on {len(self.streams)} stream(s)")
+                last_count, last_time = count, now
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+
+    def run_worker(self, consumer, stream=ORDER_STREAM):
+        """Worker loop: reclaim stale entries, then read new orders from stream in batches"""
+        next_claim = 0
+        while not self.stop_event.is_set():
+            try:
+                if time.monotonic() >= next_claim:
+                    self.reclaim_pending(consumer, stream)
+                    next_claim = time.monotonic() + self.claim_idle_ms / 1000
+                
+                reply = self.redis.xreadgroup(
+                    ORDER_GROUP,
+                    consumer,
+                    {stream: ">"},
+                    count=self.batch_size,
+                    block=self.block_ms
+                )
+                for _, messages in reply or []:
+                    self.process_batch(messages, stream)
+            except Exception as e:
+                print(f"Order worker {consumer} error: {str(e)}")
+                self.stop_event.wait(1)
+
+    def reclaim_pending(self, consumer, stream=ORDER_STREAM):
+        """Take over entries left unacknowledged by crashed workers"""
+        start_id = "0-0"
+        while not self.stop_event.is_set():
+            reply = self.redis.xautoclaim(
+                stream,
+                ORDER_GROUP,
+                consumer,
+                self.claim_idle_ms,
+                start_id=start_id,
+                count=self.batch_size
+            )
+            start_id = reply[0]
+            # Entries trimmed from the stream come back without an id
+            messages = [(message_id, data) for message_id, data in reply[1] if message_id]
+            if messages:
+                self.process_batch(messages, stream)
+            if start_id == "0-0":
+                break
+
+    def reservation_groups(self, order_id, lines):
+        """Split an order's line indexes into groups reserved by one script call each
+
+        On a single server the whole order is one group. A cluster only runs
+        scripts whose keys share a hash slot, so lines are grouped by the slot
+        of their product key and each group's marker carries a {hash tag} of
+        that key to land in the same slot.
+        """
+        if not self.cluster:
+            return [(f"order:{order_id}:reservation", list(range(len(lines))))]
+        
+        groups = {}
+        for i, (pid, _) in enumerate(lines):
+            groups.setdefault(slot_of(f"product:{pid}"), []).append(i)
+        return [
+            (f"reservation:{{product:{lines[indexes[0]][0]}}}:{order_id}", indexes)
+            for indexes in groups.values()
+        ]
+
+    def process_batch(self, messages, stream=ORDER_STREAM):
+        """Reserve stock for a batch of orders, then record status and acks"""
+        start = time.perf_counter()
+        
+        # Skip status entries written to the orders stream by older versions
+        orders = []
+        invalid = []
+        for message_id, order in messages:
+            if order.get("status", "pending") != "pending":
+                continue
+            order_id = order.get("order_id", message_id)
+            try:
+                lines = order_lines(order)
+            except (KeyError, TypeError, ValueError) as e:
+                # Redelivery would fail the same way, so it is acknowledged as failed below
+                reason = f"missing {e.args[0]}" if isinstance(e, KeyError) else str(e)
+                invalid.append((order_id, order, reason))
+                continue
+            orders.append((message_id, order_id, lines, self.reservation_groups(order_id, lines)))
+        
+        # One pipelined round trip runs the reservation script for every order
+        calls = []
+        for message_id, order_id, lines, groups in orders:
+            for marker, indexes in groups:
+                calls.append((
+                    self.reserve_stock,
+                    [marker] + [f"product:{lines[i][0]}" for i in indexes],
+                    [RESERVATION_TTL] + [lines[i][1] for i in indexes]
+                ))
+        replies = iter(run_scripts(self.redis, calls))
+        
+        # Put each order's per-line results back together
+        results = []
+        releases = []
+        for message_id, order_id, lines, groups in orders:
+            group_replies = [next(replies) for _ in groups]
+            result = [None] * len(lines)
+            error = None
+            for (marker, indexes), reply in zip(groups, group_replies):
+                if isinstance(reply, Exception):
+                    error = reply
+                    continue
+                for i, line_result in zip(indexes, reply):
+                    result[i] = line_result
+            
+            # On a cluster some slots can succeed while others fail; undo those
+            failed = error is not None or any(line[0] != "reserved" for line in result if line)
+            if len(groups) > 1 and failed:
+                for (marker, indexes), reply in zip(groups, group_replies):
+                    if not isinstance(reply, Exception) and reply[0][0] == "reserved":
+                        releases.append((len(results), marker, indexes, lines))
+            results.append(error or result)
+        
+        # Orders whose release failed stay unacknowledged so a retry undoes them
+        retry = set()
+        if releases:
+            released = run_scripts(self.redis, [
+                (
+                    self.release_stock,
+                    [marker] + [f"product:{lines[i][0]}" for i in indexes],
+                    [RESERVATION_TTL] + [lines[i][1] for i in indexes]
+                )
+                for _, marker, indexes, lines in releases
+            ])
+            for (n, marker, indexes, lines), reply in zip(releases, released):
+                if isinstance(reply, Exception):
+                    print(f"Releasing stock for order {orders[n][1]} failed: {str(reply)}")
+                    retry.add(orders[n][0])
+                elif not isinstance(results[n], Exception):
+                    for i, line_result in zip(indexes, reply):
+                        results[n][i] = line_result
+        
+        # A second round trip records the outcome and acknowledges the batch
+        with self.redis.pipeline(transaction=False) as pipe:
+            fulfilled = False
+            for (message_id, order_id, lines, groups), result in zip(orders, results):
+                if message_id in retry:
+                    continue
+                status = self.order_status(result)
+                if status == "fulfilled":
+                    for (pid, _), (_, new_stock) in zip(lines, result):
+                        # Raw PUBLISH: the cluster pipeline refuses publish() but routes this by channel
+                        pipe.execute_command("PUBLISH", "inventory_updates", json.dumps({
+                            "product_id": pid,
+                            "new_stock": new_stock,
+                            "action": "update"
+                        }))
+                    # Pre-aggregated per-minute and rolling-hour sales counters, once per order
+                    record_sales(pipe, order_id, lines, self.sales_recorded_ttl)
+                    fulfilled = True
+                
+                entry = {
+                    "order_id": order_id,
+                    "product_id": ",".join(pid for pid, _ in lines),
+                    "quantity": sum(quantity for _, quantity in lines),
+                    "status": status
+                }
+                if len(lines) > 1:
+                    entry["items"] = json.dumps([
+                        {"product_id": pid, "quantity": quantity} for pid, quantity in lines
+                    ])
+                pipe.xadd(ORDER_STATUS_STREAM, entry, maxlen=ORDER_STATUS_MAXLEN, approximate=True)
+                pipe.hset(f"order:{order_id}", mapping={
+                    "status": status,
+                    "updated_at": datetime.now().isoformat()
+                })
+                pipe.expire(f"order:{order_id}", ORDER_RECORD_TTL)
+            for order_id, order, reason in invalid:
+                status = f"failed (invalid order: {reason})"
+                pipe.xadd(ORDER_STATUS_STREAM, {
+                    "order_id": order_id,
+                    "product_id": order.get("product_id", ""),
+                    "quantity": order.get("quantity", ""),
+                    "status": status
+                }, maxlen=ORDER_STATUS_MAXLEN, approximate=True)
+                pipe.hset(f"order:{order_id}", mapping={
+                    "status": status,
+                    "updated_at": datetime.now().isoformat()
+                })
+                pipe.expire(f"order:{order_id}", ORDER_RECORD_TTL)
+            
+            # Stock levels changed, so catalog snapshots are out of date
+            if fulfilled:
+                bump_catalog_version(pipe)
+            for message_id, order in messages:
+                if message_id not in retry:
+                    pipe.xack(stream, ORDER_GROUP, message_id)
+            pipe.execute()
+        
+        REGISTRY.operation("order_fulfilment", time.perf_counter() - start)
+        with self.processed_lock:
+            self.processed += len(messages)
+        if self.on_processed:
+            self.on_processed(len(messages))
+
+    def order_status(self, result):
+        """Summarize the per-line reservation result as an order status"""
+        if isinstance(result, Exception):
+            return f"failed (error: {str(result)})"
+        statuses = {status for status, _ in result}
+        if "invalid" in statuses:
+            return "failed (invalid quantity)"
+        if "missing" in statuses:
+            return "failed (unknown product)"
+        # Lines released after another cluster slot failed were not reserved either
+        if "insufficient" in statuses or "released" in statuses:
+            return "failed (insufficient stock)"
+        return "fulfilled"
 
 class ECommerceApp:
     def __init__(self, root):
@@ -17,37 +943,77 @@ class ECommerceApp:
         self.root.configure(bg="#f5f5f5")
         
         # Initialize Redis connection
-        self.redis = Redis(
-            host='localhost', 
-            port=6379, 
-            decode_responses=True,
-            socket_connect_timeout=3
-        )
+        self.redis = connect_redis()
+
+        # Identifies the catalog load in progress so stale pages are dropped
+        self.product_load_token = None
+        
+        # Last loaded catalog on disk, shown at startup while Redis is reconciled
+        self.catalog_snapshot = CatalogSnapshot(source=f"{SETTINGS.host}:{SETTINGS.port}")
+        
+        # Filters and cursor of the current search, for fetching more pages
+        self.search_params = None
+        self.search_cursor = None
+        
+        # Pending debounce timer and in-flight request of the autocomplete
+        self.suggest_after = None
+        self.suggest_future = None
+        
+        # Local product reads go through a cache invalidated by Redis
+        self.product_cache = ProductCache(self.redis)
+        self.product_cache.start_invalidation_listener()
+        
+        # UI operations run on the engine; results come back through on_frame
+        self.engine = RedisEngine(callback_queue=queue.Queue(), product_cache=self.product_cache)
+        
+        # Closing the window flushes the engine's buffered system_log events first
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        
+        # pid -> Treeview item, so inventory updates patch rows in place
+        self.product_rows = {}
+        self.inventory_queue = queue.Queue()
         
+        # Order feed cursor: only entries after order_feed_last_id are read
+        self.order_feed_last_id = None
+        self.order_feed_limit = ORDER_FEED_ROWS
+        self.order_feed_busy = False
+        self.order_feed_stale = False
+
         try:
             self.redis.ping()
             self.setup_data()
         except Exception as e:
             messagebox.showerror("Redis Connection Failed", f"Could not connect to Redis: {str(e)}")
-            self.root.destroy()
+            self.on_close()
             return
         
         # Setup UI
         self.create_widgets()
         self.start_stream_listener()
         
+        # Orders are fulfilled in the background; refresh the feed as they complete
+        self.order_processor = OrderProcessor(
+            self.redis,
+            workers=2,
+            on_processed=lambda count: self.engine.post(self.load_orders)
+        )
+        self.order_processor.start()
+        
+    def on_close(self):
+        """Close the engine, flushing its system_log buffer, then the window"""
+        try:
+            self.engine.close()
+        except Exception as e:
+            print(f"Engine shutdown failed: {str(e)}")
+        finally:
+            self.root.destroy()
+
     def setup_data(self):
         """Initialize sample data if not exists"""
         try:
             self.redis.ft("products").info()
         except:
-            schema = (
-                TextField("name"),
-                TextField("description"),
-                NumericField("price"),
-                NumericField("inventory")
-            )
-            self.redis.ft("products").create_index(schema)
+            create_products_index(self.redis)
             
             # Add sample products
             sample_products = [
@@ -56,10 +1022,33 @@ class ECommerceApp:
                 ("1003", "Smart Watch", "Fitness tracking with notifications", 249.99, 20)
             ]
             for pid, name, desc, price, inventory in sample_products:
-                self.add_product_to_redis(pid, name, desc, price, inventory)
+                self.engine.call(self.engine.add_product(pid, name, desc, price, inventory))
             
             self.redis.set("system:total_products", len(sample_products))
-            self.redis.xadd("system_log", {"event": "init", "message": "Sample data loaded"})
+            self.engine.log_writer.log({"event": "init", "message": "Sample data loaded"})
+            return
+        
+        if self.redis.get("system:products_index_version") != PRODUCTS_INDEX_VERSION:
+            self.migrate_products_index()
+        
+        # Catalogs created before autocomplete have no suggestion dictionary yet
+        if not self.redis.ft().suglen(SUGGEST_KEY):
+            added = build_suggestions(self.redis, self.engine)
+            self.engine.log_writer.log({"event": "migrate", "message": f"Built {added} product suggestions"})
+
+    def migrate_products_index(self):
+        """Rebuild an outdated products index over the existing JSON documents"""
+        # Keep the product documents, only the index definition is replaced
+        self.redis.ft("products").dropindex(delete_documents=False)
+        
+        # Remove the prod:* hashes written by the old double-write indexing
+        with self.redis.pipeline(transaction=False) as pipe:
+            for key in self.redis.scan_iter(match="prod:*", count=PRODUCT_PAGE_SIZE):
+                pipe.unlink(key)
+            pipe.execute()
+        
+        create_products_index(self.redis)
+        self.engine.log_writer.log({"event": "migrate", "message": "Products index rebuilt"})
 
     def create_widgets(self):
         # Configure styles
@@ -77,6 +1066,15 @@ class ECommerceApp:
             bg="#2c3e50"
         ).pack(side="left")
         
+        self.log_stats_var = tk.StringVar(value="Log queue: 0")
+        tk.Label(
+            header,
+            textvariable=self.log_stats_var,
+            fg="#a3d9ff",
+            bg="#2c3e50",
+            font=("Helvetica", 10)
+        ).pack(side="right")
+        
         # Main Content Frame
         main_frame = tk.Frame(self.root, bg="#f5f5f5")
         main_frame.pack(fill="both", expand=True, padx=20, pady=10)
@@ -129,6 +1127,16 @@ class ECommerceApp:
         
         self.search_entry = tk.Entry(search_frame, font=("Helvetica", 12), width=25)
         self.search_entry.pack(side="left", padx=(0, 5), fill="x", expand=True)
+        self.search_entry.bind("<KeyRelease>", self.on_search_keystroke)
+        self.search_entry.bind("<Return>", lambda e: self.search_products())
+        self.search_entry.bind("<Down>", lambda e: self.focus_suggestions())
+        self.search_entry.bind("<Escape>", lambda e: self.hide_suggestions())
+        
+        # Autocomplete dropdown, placed under the entry while it has suggestions
+        self.suggest_list = tk.Listbox(left_panel, font=("Helvetica", 11), height=SUGGEST_COUNT)
+        self.suggest_list.bind("<ButtonRelease-1>", lambda e: self.choose_suggestion())
+        self.suggest_list.bind("<Return>", lambda e: self.choose_suggestion())
+        self.suggest_list.bind("<Escape>", lambda e: self.hide_suggestions())
         
         tk.Button(
             search_frame,
@@ -139,6 +1147,53 @@ class ECommerceApp:
             command=self.search_products
         ).pack(side="left")
         
+        # Search Filters
+        filter_frame = tk.Frame(left_panel, bg="#ecf0f1")
+        filter_frame.pack(fill="x", pady=(0, 5))
+        
+        tk.Label(filter_frame, text="Price:", bg="#ecf0f1").pack(side="left")
+        self.min_price_entry = tk.Entry(filter_frame, width=7)
+        self.min_price_entry.pack(side="left", padx=2)
+        tk.Label(filter_frame, text="to", bg="#ecf0f1").pack(side="left")
+        self.max_price_entry = tk.Entry(filter_frame, width=7)
+        self.max_price_entry.pack(side="left", padx=2)
+        
+        self.in_stock_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(
+            filter_frame,
+            text="In stock",
+            variable=self.in_stock_var,
+            bg="#ecf0f1"
+        ).pack(side="left", padx=5)
+        
+        self.sort_var = tk.StringVar(value="Relevance")
+        ttk.Combobox(
+            filter_frame,
+            textvariable=self.sort_var,
+            values=list(SEARCH_SORT_OPTIONS),
+            state="readonly",
+            width=10
+        ).pack(side="left", padx=5)
+        
+        self.more_results_button = tk.Button(
+            filter_frame,
+            text="⬇ More",
+            font=("Helvetica", 9),
+            state="disabled",
+            command=self.load_more_results
+        )
+        self.more_results_button.pack(side="right")
+        
+        self.facets_var = tk.StringVar()
+        tk.Label(
+            left_panel,
+            textvariable=self.facets_var,
+            font=("Helvetica", 9),
+            bg="#ecf0f1",
+            fg="#7f8c8d",
+            anchor="w"
+        ).pack(fill="x")
+        
         # Product Treeview
         self.product_tree = ttk.Treeview(
             left_panel,
@@ -194,6 +1249,47 @@ class ECommerceApp:
         self.orders_tree.column("timestamp", width=150)
         self.orders_tree.pack(fill="both", pady=5)
         
+        tk.Button(
+            orders_frame,
+            text="⬇ Older Orders",
+            font=("Helvetica", 9),
+            command=self.load_older_orders
+        ).pack(anchor="e")
+        
+        # Sales Dashboard Frame
+        sales_frame = tk.Frame(right_panel, bg="#ecf0f1")
+        sales_frame.pack(fill="both", expand=True, pady=(10, 0))
+        
+        tk.Label(
+            sales_frame,
+            text="📈 Top Sellers (Last Hour)",
+            font=("Helvetica", 14, "bold"),
+            bg="#ecf0f1"
+        ).pack(anchor="w")
+        
+        self.sales_tree = ttk.Treeview(
+            sales_frame,
+            columns=("product_id", "hour_units", "recent_units"),
+            show="headings",
+            height=5
+        )
+        self.sales_tree.heading("product_id", text="Product ID")
+        self.sales_tree.heading("hour_units", text="Units (hour)")
+        self.sales_tree.heading("recent_units", text=f"Units ({SALES_WINDOW_MINUTES} min)")
+        self.sales_tree.column("product_id", width=120)
+        self.sales_tree.column("hour_units", width=100, anchor="center")
+        self.sales_tree.column("recent_units", width=100, anchor="center")
+        self.sales_tree.pack(fill="both", pady=5)
+        
+        self.selected_sales_var = tk.StringVar(value="Select a product to see its recent sales")
+        tk.Label(
+            sales_frame,
+            textvariable=self.selected_sales_var,
+            font=("Helvetica", 9),
+            bg="#ecf0f1",
+            fg="#7f8c8d"
+        ).pack(anchor="w")
+        
         # Inventory Updates Frame
         inventory_frame = tk.Frame(right_panel, bg="#ecf0f1")
         inventory_frame.pack(fill="both", expand=True, pady=(10, 0))
@@ -230,9 +1326,23 @@ class ECommerceApp:
             padx=20
         ).pack(side="bottom", fill="x")
         
+        self.metrics_var = tk.StringVar(value=REGISTRY.summary(METRICS_SUMMARY))
+        tk.Label(
+            self.root,
+            textvariable=self.metrics_var,
+            font=("Helvetica", 9),
+            bg="#34495e",
+            fg="#a3d9ff",
+            anchor="w",
+            padx=20
+        ).pack(side="bottom", fill="x")
+        
         # Load initial data
-        self.load_products()
+        self.warm_start()
         self.load_orders()
+        self.root.after(UI_FRAME_MS, self.on_frame)
+        self.root.after(LOG_STATS_INTERVAL_MS, self.update_log_stats)
+        self.refresh_sales_dashboard()
 
     def configure_styles(self):
         style = ttk.Style()
@@ -249,91 +1359,6 @@ class ECommerceApp:
                  background=[("selected", "#2980b9")],
                  foreground=[("selected", "white")])
 
-    # Core Product Functions ====================================
-
-    def add_product_to_redis(self, pid, name, description, price, inventory):
-        """Atomic operation to add product to both JSON and search index"""
-        product_data = {
-            "name": name,
-            "description": description,
-            "price": float(price),
-            "inventory": int(inventory),
-            "created_at": datetime.now().isoformat()
-        }
-        
-        # Store in JSON
-        self.redis.json().set(f"product:{pid}", "$", product_data)
-        
-        # Index in RediSearch
-        self.redis.ft("products").add_document(
-            f"prod:{pid}",
-            name=name,
-            description=description,
-            price=price,
-            inventory=inventory
-        )
-        
-        # Log event
-        self.redis.xadd("system_log", {
-            "event": "product_add",
-            "product_id": pid,
-            "name": name
-        })
-
-    def update_product_in_redis(self, pid, updates):
-        """Update existing product data"""
-        current = self.redis.json().get(f"product:{pid}")
-        if not current:
-            raise ValueError(f"Product {pid} not found")
-        
-        # Update JSON data
-        updated = {**current, **updates}
-        self.redis.json().set(f"product:{pid}", "$", updated)
-        
-        # Update search index
-        self.redis.ft("products").add_document(
-            f"prod:{pid}",
-            name=updated.get("name", current["name"]),
-            description=updated.get("description", current["description"]),
-            price=updated.get("price", current["price"]),
-            inventory=updated.get("inventory", current["inventory"])
-        )
-        
-        # Publish inventory update if stock changed
-        if "inventory" in updates:
-            self.redis.publish("inventory_updates", json.dumps({
-                "product_id": pid,
-                "new_stock": updates["inventory"],
-                "action": "update"
-            }))
-        
-        # Log event
-        self.redis.xadd("system_log", {
-            "event": "product_update",
-            "product_id": pid
-        })
-
-    def delete_product_from_redis(self, pid):
-        """Remove product from system"""
-        # Get product name for logging
-        product = self.redis.json().get(f"product:{pid}")
-        
-        # Delete from JSON store
-        self.redis.json().delete(f"product:{pid}")
-        
-        # Delete from search index
-        self.redis.ft("products").delete_document(f"prod:{pid}")
-        
-        # Update total count
-        self.redis.decr("system:total_products")
-        
-        # Log event
-        self.redis.xadd("system_log", {
-            "event": "product_delete",
-            "product_id": pid,
-            "name": product["name"] if product else "Unknown"
-        })
-
     # UI Dialog Functions ======================================
 
     def show_add_product_dialog(self):
@@ -379,20 +1404,25 @@ class ECommerceApp:
                     raise ValueError("Price must be positive")
                 if inventory < 0:
                     raise ValueError("Inventory cannot be negative")
-                
-                # Generate ID and add product
-                pid = str(uuid.uuid4())[:8].upper()
-                self.add_product_to_redis(pid, name, description, price, inventory)
-                
-                # Update UI
-                self.load_products()
-                self.status_var.set(f"✅ Added new product: {name}")
-                dialog.destroy()
-                
             except ValueError as e:
                 messagebox.showerror("Invalid Input", str(e), parent=dialog)
-            except Exception as e:
-                messagebox.showerror("Error", f"Failed to add product: {str(e)}", parent=dialog)
+                return
+            
+            def added(result):
+                self.insert_product_row(pid, {"name": name, "price": price, "inventory": inventory})
+                self.status_var.set(f"✅ Added new product: {name}")
+                dialog.destroy()
+            
+            def failed(error):
+                messagebox.showerror("Error", f"Failed to add product: {str(error)}", parent=dialog)
+            
+            # Generate ID and add product
+            pid = str(uuid.uuid4())[:8].upper()
+            self.engine.submit(
+                self.engine.add_product(pid, name, description, price, inventory),
+                callback=added,
+                errback=failed
+            )
         
         # Submit button
         tk.Button(
@@ -412,8 +1442,14 @@ class ECommerceApp:
             return
             
         pid = self.product_tree.item(selected[0], "values")[0]
-        product_data = self.redis.json().get(f"product:{pid}")
-        
+        self.engine.submit(
+            self.engine.get_product(pid),
+            callback=lambda product_data: self.open_edit_dialog(pid, product_data),
+            errback=lambda e: messagebox.showerror("Error", f"Failed to load product: {str(e)}")
+        )
+
+    def open_edit_dialog(self, pid, product_data):
+        """Build the edit dialog once the product document has been read"""
         if not product_data:
             messagebox.showerror("Error", "Selected product not found in database")
             return
@@ -450,7 +1486,7 @@ class ECommerceApp:
         
         def submit():
             try:
-                updates = {
+                values = {
                     "name": entries[0].get().strip(),
                     "description": entries[1].get().strip(),
                     "price": float(entries[2].get()),
@@ -458,25 +1494,39 @@ class ECommerceApp:
                 }
                 
                 # Validate
-                if not updates["name"]:
+                if not values["name"]:
                     raise ValueError("Product name is required")
-                if updates["price"] <= 0:
+                if values["price"] <= 0:
                     raise ValueError("Price must be positive")
-                if updates["inventory"] < 0:
+                if values["inventory"] < 0:
                     raise ValueError("Inventory cannot be negative")
-                
-                # Update product
-                self.update_product_in_redis(pid, updates)
-                
-                # Refresh UI
-                self.load_products()
-                self.status_var.set(f"✅ Updated product: {updates['name']}")
-                dialog.destroy()
-                
             except ValueError as e:
                 messagebox.showerror("Invalid Input", str(e), parent=dialog)
-            except Exception as e:
-                messagebox.showerror("Error", f"Failed to update product: {str(e)}", parent=dialog)
+                return
+            
+            # Only send the fields that were actually edited
+            updates = {
+                field: value for field, value in values.items()
+                if value != product_data.get(field)
+            }
+            if not updates:
+                self.status_var.set(f"No changes to product: {values['name']}")
+                dialog.destroy()
+                return
+            
+            def updated(result):
+                self.patch_product_row(pid, updates)
+                self.status_var.set(f"✅ Updated product: {values['name']}")
+                dialog.destroy()
+            
+            def failed(error):
+                messagebox.showerror("Error", f"Failed to update product: {str(error)}", parent=dialog)
+            
+            self.engine.submit(
+                self.engine.update_product(pid, updates),
+                callback=updated,
+                errback=failed
+            )
         
         # Submit button
         tk.Button(
@@ -503,86 +1553,362 @@ class ECommerceApp:
             f"Permanently delete product:\n\n{name} (ID: {pid})?\n\nThis cannot be undone!",
             icon="warning"
         ):
-            try:
-                self.delete_product_from_redis(pid)
-                self.load_products()
+            def deleted(result):
+                item = self.product_rows.pop(pid, None)
+                if item is not None and self.product_tree.exists(item):
+                    self.product_tree.delete(item)
                 self.status_var.set(f"❌ Deleted product: {name}")
-            except Exception as e:
-                messagebox.showerror("Error", f"Failed to delete product: {str(e)}")
+            
+            self.engine.submit(
+                self.engine.delete_product(pid),
+                callback=deleted,
+                errback=lambda e: messagebox.showerror("Error", f"Failed to delete product: {str(e)}")
+            )
 
     # Data Loading Functions ===================================
 
-    def load_products(self):
-        """Load products into the treeview"""
-        for item in self.product_tree.get_children():
-            self.product_tree.delete(item)
+    def insert_product_row(self, pid, product_data):
+        """Append a product row and remember its Treeview item"""
+        self.product_rows[pid] = self.product_tree.insert("", "end", values=(
+            pid,
+            product_data["name"],
+            f"${float(product_data['price']):.2f}",
+            product_data["inventory"]
+        ))
+
+    def patch_product_row(self, pid, updates):
+        """Update the displayed columns of a single product row in place"""
+        item = self.product_rows.get(pid)
+        if item is None or not self.product_tree.exists(item):
+            return
+        if "name" in updates:
+            self.product_tree.set(item, "name", updates["name"])
+        if "price" in updates:
+            self.product_tree.set(item, "price", f"${float(updates['price']):.2f}")
+        if "inventory" in updates:
+            self.product_tree.set(item, "inventory", updates["inventory"])
+
+    def clear_product_rows(self):
+        """Remove every product row from the Treeview"""
+        self.product_tree.delete(*self.product_tree.get_children())
+        self.product_rows = {}
+
+    def warm_start(self):
+        """Show the catalog snapshot immediately, then reconcile it with Redis"""
+        snapshot = self.catalog_snapshot.load_products()
+        if snapshot is None:
+            self.load_products()
+            return
+        
+        version, products = snapshot
+        for pid, product_data in products:
+            self.insert_product_row(pid, product_data)
+        self.status_var.set(f"⚡ Showing {len(products)} products from snapshot | reconciling with Redis...")
+        
+        self.product_load_token = token = object()
+        self.engine.submit(
+            self.engine.catalog_version(),
+            callback=lambda current: self.reconcile_snapshot(token, version, current),
+            errback=lambda e: self.on_product_load_error(token, e)
+        )
+
+    def reconcile_snapshot(self, token, version, current):
+        """Keep the snapshot rows if the catalog has not changed, else re-read it in place"""
+        if token is not self.product_load_token:
+            return
+        if current == version:
+            self.product_load_token = None
+            self.status_var.set(f"✅ Catalog up to date | {len(self.product_rows)} products from snapshot")
+            return
+        self.load_products(reconcile=True)
+
+    def load_products(self, reconcile=False):
+        """Load products into the treeview one page at a time
+
+        With reconcile the rows on screen are kept: pages patch or add rows,
+        and rows not found in Redis are removed at the end.
+        """
+        if not reconcile:
+            self.clear_product_rows()
+        
+        # A new token supersedes any load still fetching pages
+        self.product_load_token = token = object()
+        self.product_load_started = time.perf_counter()
+        self.product_load_seen = {}
+        
+        # Read the version first so writes during the scan leave the snapshot stale
+        self.engine.submit(
+            self.engine.catalog_version(),
+            callback=lambda version: self.request_product_page(token, 0, version),
+            errback=lambda e: self.on_product_load_error(token, e)
+        )
+
+    def request_product_page(self, token, cursor, version):
+        """Ask the engine for the next SCAN page of the catalog"""
+        self.engine.submit(
+            self.engine.fetch_product_page(cursor, PRODUCT_PAGE_SIZE),
+            callback=lambda page: self.on_product_page(token, version, page),
+            errback=lambda e: self.on_product_load_error(token, e)
+        )
+
+    def on_product_page(self, token, version, page):
+        """Insert or patch a catalog page and request the next one"""
+        if token is not self.product_load_token:
+            return
+        
+        cursor, products = page
+        seen = self.product_load_seen
+        for pid, product_data in products:
+            # SCAN may return a key more than once while the keyspace is rehashing
+            if pid in seen:
+                continue
+            seen[pid] = product_data
+            if pid in self.product_rows:
+                self.patch_product_row(pid, product_data)
+            else:
+                self.insert_product_row(pid, product_data)
+        
+        if cursor == 0:
+            self.product_load_token = None
+            for pid in [pid for pid in self.product_rows if pid not in seen]:
+                self.product_tree.delete(self.product_rows.pop(pid))
+            REGISTRY.operation("load_products", time.perf_counter() - self.product_load_started)
+            self.status_var.set(f"🔄 Loaded {len(seen)} products | {self.product_cache.summary()}")
             
+            # Save off the Tk thread; the next start renders from it
+            threading.Thread(
+                target=self.save_catalog_snapshot,
+                args=(version, list(seen.items())),
+                daemon=True
+            ).start()
+            return
+        
+        self.status_var.set(f"🔄 Loading products... {len(seen)}")
+        self.request_product_page(token, cursor, version)
+
+    def save_catalog_snapshot(self, version, products):
         try:
-            # Get all products using JSON
-            products = self.redis.keys("product:*")
-            for product_key in products:
-                product_data = self.redis.json().get(product_key)
-                if product_data:
-                    self.product_tree.insert("", "end", values=(
-                        product_key.split(":")[1],
-                        product_data["name"],
-                        f"${product_data['price']:.2f}",
-                        product_data["inventory"]
-                    ))
-                    
-            self.status_var.set(f"🔄 Loaded {len(products)} products")
+            self.catalog_snapshot.save_products(version, products)
         except Exception as e:
-            self.status_var.set(f"❌ Error loading products: {str(e)}")
-            messagebox.showerror("Error", f"Failed to load products: {str(e)}")
+            print(f"Catalog snapshot not saved: {str(e)}")
+
+    def on_product_load_error(self, token, error):
+        """Report a failed catalog page unless the load was superseded"""
+        if token is not self.product_load_token:
+            return
+        self.product_load_token = None
+        self.status_var.set(f"❌ Error loading products: {str(error)}")
+        messagebox.showerror("Error", f"Failed to load products: {str(error)}")
 
     def search_products(self):
-        """Search products using RediSearch"""
+        """Search products using RediSearch with filters, sorting and paging done server-side"""
+        # A search replaces any pending or in-flight autocomplete
+        self.hide_suggestions()
+        if self.suggest_after is not None:
+            self.root.after_cancel(self.suggest_after)
+            self.suggest_after = None
+        if self.suggest_future is not None:
+            self.suggest_future.cancel()
+            self.suggest_future = None
         query = self.search_entry.get().strip()
-        if not query:
+        try:
+            min_price = float(self.min_price_entry.get()) if self.min_price_entry.get().strip() else None
+            max_price = float(self.max_price_entry.get()) if self.max_price_entry.get().strip() else None
+        except ValueError:
+            messagebox.showerror("Invalid Input", "Price filters must be numbers")
+            return
+        sort_by, ascending = SEARCH_SORT_OPTIONS[self.sort_var.get()]
+        
+        if not query and min_price is None and max_price is None and not self.in_stock_var.get() and not sort_by:
+            self.search_params = None
+            self.more_results_button.config(state="disabled")
+            self.facets_var.set("")
             self.load_products()
             return
-            
-        try:
-            results = self.redis.ft("products").search(
-                Query(query).slop(1)
-            )
-            
-            self.product_tree.delete(*self.product_tree.get_children())
-            
-            for doc in results.docs:
-                product_data = self.redis.json().get(f"product:{doc.id}")
-                if product_data:
-                    self.product_tree.insert("", "end", values=(
-                        doc.id,
-                        product_data["name"],
-                        f"${product_data['price']:.2f}",
-                        product_data["inventory"]
-                    ))
-                    
-            self.status_var.set(f"🔍 Found {results.total} products matching '{query}'")
-            
-        except Exception as e:
-            self.status_var.set(f"❌ Search failed: {str(e)}")
-            messagebox.showerror("Search Error", str(e))
+        
+        self.search_params = {
+            "text": query,
+            "min_price": min_price,
+            "max_price": max_price,
+            "in_stock": self.in_stock_var.get(),
+            "sort_by": sort_by,
+            "ascending": ascending
+        }
+        self.request_search_page(None)
+
+    def load_more_results(self):
+        """Fetch the page after the last one shown"""
+        if self.search_params and self.search_cursor:
+            self.request_search_page(self.search_cursor)
+
+    def request_search_page(self, cursor):
+        """Submit a search for the page at cursor (None for the first page)"""
+        # A new token also stops any catalog load from appending to the results
+        self.product_load_token = token = object()
+        self.more_results_button.config(state="disabled")
+        self.engine.submit(
+            self.engine.search_products(cursor=cursor, **self.search_params),
+            callback=lambda result: self.show_search_results(token, cursor is None, result),
+            errback=lambda e: self.on_search_error(token, e)
+        )
+
+    def show_search_results(self, token, first_page, result):
+        """Show a page of search hits, replacing the rows on the first page"""
+        if token is not self.product_load_token:
+            return
+        self.product_load_token = None
+        
+        total, products, self.search_cursor, facets = result
+        if first_page:
+            self.clear_product_rows()
+        for pid, product_data in products:
+            if pid not in self.product_rows:
+                self.insert_product_row(pid, product_data)
+        self.more_results_button.config(state="normal" if self.search_cursor else "disabled")
+        
+        if facets is not None:
+            self.facets_var.set("  ".join(
+                f"${low:.0f}-{low + PRICE_FACET_WIDTH:.0f}: {count}" for low, count in facets
+            ))
+        self.status_var.set(f"🔍 Showing {len(self.product_rows)} of {total} matching products")
+
+    def on_search_error(self, token, error):
+        """Report a failed search unless it was superseded"""
+        if token is not self.product_load_token:
+            return
+        self.product_load_token = None
+        self.status_var.set(f"❌ Search failed: {str(error)}")
+        messagebox.showerror("Search Error", str(error))
+
+    # Autocomplete Functions ===================================
+
+    def on_search_keystroke(self, event):
+        """Restart the debounce timer on every edit of the search text"""
+        if event.keysym in ("Return", "Escape", "Down", "Up"):
+            return
+        if self.suggest_after is not None:
+            self.root.after_cancel(self.suggest_after)
+        self.suggest_after = self.root.after(SUGGEST_DEBOUNCE_MS, self.request_suggestions)
+
+    def request_suggestions(self):
+        """Ask for suggestions for the current prefix, cancelling the previous request"""
+        self.suggest_after = None
+        if self.suggest_future is not None:
+            self.suggest_future.cancel()
+            self.suggest_future = None
+        
+        prefix = self.search_entry.get().strip()
+        if not prefix:
+            self.hide_suggestions()
+            return
+        
+        self.suggest_future = future = self.engine.submit(
+            self.engine.suggest_products(prefix),
+            callback=lambda suggestions: self.show_suggestions(future, suggestions),
+            errback=lambda e: self.status_var.set(f"❌ Autocomplete failed: {str(e)}")
+        )
+
+    def show_suggestions(self, future, suggestions):
+        """Fill the dropdown unless a newer request superseded this one"""
+        if future is not self.suggest_future:
+            return
+        self.suggest_future = None
+        
+        self.suggest_list.delete(0, "end")
+        for name, pid in suggestions:
+            self.suggest_list.insert("end", name)
+        if suggestions:
+            self.suggest_list.place(in_=self.search_entry, relx=0, rely=1, relwidth=1)
+            self.suggest_list.lift()
+        else:
+            self.hide_suggestions()
+
+    def focus_suggestions(self):
+        if self.suggest_list.size():
+            self.suggest_list.focus_set()
+            self.suggest_list.selection_set(0)
+
+    def choose_suggestion(self):
+        """Search for the highlighted suggestion"""
+        selected = self.suggest_list.curselection()
+        if not selected:
+            return
+        self.search_entry.delete(0, "end")
+        self.search_entry.insert(0, self.suggest_list.get(selected[0]))
+        self.hide_suggestions()
+        self.search_entry.focus_set()
+        self.search_products()
+
+    def hide_suggestions(self):
+        self.suggest_list.place_forget()
+
+    # Order Feed Functions =====================================
 
     def load_orders(self):
-        """Load recent orders from stream"""
-        for item in self.orders_tree.get_children():
-            self.orders_tree.delete(item)
-            
-        try:
-            orders = self.redis.xrevrange("orders", "+", "-", count=10)
-            for order_id, order_data in orders:
-                timestamp = datetime.fromtimestamp(int(order_id.split("-")[0])/1000)
-                self.orders_tree.insert("", "end", values=(
-                    order_id.split("-")[0],
-                    order_data["product_id"],
-                    order_data["quantity"],
-                    order_data["status"],
-                    timestamp.strftime("%Y-%m-%d %H:%M:%S")
-                ))
-        except Exception as e:
-            self.status_var.set(f"❌ Error loading orders: {str(e)}")
+        """Append order statuses written since the last refresh"""
+        # Refreshes requested while a read is in flight collapse into one follow-up
+        if self.order_feed_busy:
+            self.order_feed_stale = True
+            return
+        
+        self.order_feed_busy = True
+        self.order_feed_stale = False
+        self.engine.submit(
+            self.engine.tail_orders(self.order_feed_last_id, ORDER_FEED_BATCH),
+            callback=self.append_new_orders,
+            errback=self.on_order_feed_error
+        )
+
+    def append_new_orders(self, entries):
+        """Insert new statuses at the top of the feed and trim the oldest rows"""
+        self.order_feed_busy = False
+        for entry_id, order_data in entries:
+            if not self.orders_tree.exists(entry_id):
+                self.orders_tree.insert("", 0, iid=entry_id, values=self.order_row(entry_id, order_data))
+            self.order_feed_last_id = entry_id
+        
+        rows = self.orders_tree.get_children()
+        if len(rows) > self.order_feed_limit:
+            self.orders_tree.delete(*rows[self.order_feed_limit:])
+        
+        # A full batch means more entries are waiting
+        if len(entries) == ORDER_FEED_BATCH or self.order_feed_stale:
+            self.load_orders()
+
+    def on_order_feed_error(self, error):
+        self.order_feed_busy = False
+        self.status_var.set(f"❌ Error loading orders: {str(error)}")
+
+    def load_older_orders(self):
+        """Page older statuses in below the live feed"""
+        rows = self.orders_tree.get_children()
+        if not rows:
+            return
+        self.engine.submit(
+            self.engine.older_orders(rows[-1], ORDER_HISTORY_PAGE),
+            callback=self.append_older_orders,
+            errback=self.on_order_feed_error
+        )
+
+    def append_older_orders(self, entries):
+        """Append a history page and grow the feed so it is not trimmed away"""
+        for entry_id, order_data in entries:
+            if not self.orders_tree.exists(entry_id):
+                self.orders_tree.insert("", "end", iid=entry_id, values=self.order_row(entry_id, order_data))
+        self.order_feed_limit = max(self.order_feed_limit, len(self.orders_tree.get_children()))
+        if not entries:
+            self.status_var.set("📦 No older orders")
+
+    def order_row(self, entry_id, order_data):
+        """Treeview values for one order status entry"""
+        timestamp = datetime.fromtimestamp(int(entry_id.split("-")[0])/1000)
+        return (
+            entry_id.split("-")[0],
+            order_data["product_id"],
+            order_data["quantity"],
+            order_data["status"],
+            timestamp.strftime("%Y-%m-%d %H:%M:%S")
+        )
 
     # Real-Time Functions ======================================
 
@@ -592,85 +1918,161 @@ class ECommerceApp:
             pubsub = self.redis.pubsub()
             pubsub.subscribe("inventory_updates")
             
+            # Only queue here; the Tk thread applies updates once per frame
             for message in pubsub.listen():
                 if message["type"] == "message":
                     try:
-                        update = json.loads(message["data"])
-                        self.root.after(0, self.display_inventory_update, update)
+                        self.inventory_queue.put(json.loads(message["data"]))
                     except json.JSONDecodeError:
                         pass
         
         thread = threading.Thread(target=listener, daemon=True)
         thread.start()
 
-    def display_inventory_update(self, update):
-        """Display inventory updates in the text widget"""
-        self.inventory_text.config(state="normal")
+    def update_log_stats(self):
+        """Show system_log writer queue depth and flush latency"""
+        stats = self.engine.log_writer.stats()
+        self.log_stats_var.set(
+            f"Log queue: {stats['queue_depth']} | last flush {stats['last_flush_ms']:.1f}ms"
+            f" | dropped {stats['dropped']}"
+        )
+        self.metrics_var.set(REGISTRY.summary(METRICS_SUMMARY))
+        self.root.after(LOG_STATS_INTERVAL_MS, self.update_log_stats)
+
+    def refresh_sales_dashboard(self):
+        """Query the sales leaderboard and rolling window, then reschedule"""
+        selected = self.product_tree.selection()
+        pid = self.product_tree.item(selected[0], "values")[0] if selected else None
+        self.engine.submit(
+            self.engine.sales_dashboard(SALES_TOP_N, SALES_WINDOW_MINUTES, pid),
+            callback=lambda result: self.show_sales_dashboard(result, pid),
+            errback=lambda e: self.status_var.set(f"❌ Sales dashboard error: {str(e)}")
+        )
+        self.root.after(SALES_REFRESH_MS, self.refresh_sales_dashboard)
+
+    def show_sales_dashboard(self, result, pid):
+        """Display top sellers and the selected product's recent units"""
+        leaders, recent = result
+        self.sales_tree.delete(*self.sales_tree.get_children())
+        for leader, units in leaders:
+            self.sales_tree.insert("", "end", values=(leader, units, recent.get(leader, 0)))
+        
+        if pid:
+            self.selected_sales_var.set(
+                f"{pid}: {recent.get(pid, 0)} units in the last {SALES_WINDOW_MINUTES} minutes"
+            )
+
+    def on_frame(self):
+        """Run engine callbacks and queued inventory updates once per frame"""
+        try:
+            with REGISTRY.time("ui_frame"):
+                self.engine.drain_callbacks()
+                self.flush_inventory_updates()
+        except Exception as e:
+            print(f"UI frame error: {str(e)}")
+        finally:
+            # One failure must not stop the frame loop and strand later callbacks
+            self.root.after(UI_FRAME_MS, self.on_frame)
+
+    def flush_inventory_updates(self):
+        """Apply all inventory updates queued since the last frame"""
+        latest = {}
+        other = []
+        received = 0
+        while True:
+            try:
+                update = self.inventory_queue.get_nowait()
+            except queue.Empty:
+                break
+            received += 1
+            if not isinstance(update, dict):
+                print(f"Ignoring malformed inventory update: {update!r}")
+            elif update.get("action", "update") in ("update", "add"):
+                if "product_id" not in update or "new_stock" not in update:
+                    print(f"Ignoring inventory update without product_id/new_stock: {update!r}")
+                    continue
+                # Only the most recent stock level per product matters
+                latest[update["product_id"]] = update
+            else:
+                other.append(update)
+        
+        if received:
+            self.display_inventory_updates(latest, other, received)
+
+    def display_inventory_updates(self, latest, other, received):
+        """Patch affected product rows and log the coalesced updates"""
         timestamp = datetime.now().strftime("%H:%M:%S")
+        lines = []
+        for pid, update in latest.items():
+            self.patch_product_row(pid, {"inventory": update["new_stock"]})
+            if update.get("action", "update") == "add":
+                lines.append(f"[{timestamp}] New product: {pid} added with {update['new_stock']} units\n")
+            else:
+                lines.append(f"[{timestamp}] Stock update: Product {pid} → {update['new_stock']} units\n")
+        for update in other:
+            lines.append(f"[{timestamp}] Inventory change: {update}\n")
+        if received > len(lines):
+            lines.append(f"[{timestamp}] ({received} updates coalesced)\n")
         
-        action = update.get("action", "update")
-        if action == "update":
-            msg = f"[{timestamp}] Stock update: Product {update['product_id']} → {update['new_stock']} units\n"
-        elif action == "add":
-            msg = f"[{timestamp}] New product: {update['product_id']} added with {update['new_stock']} units\n"
-        else:
-            msg = f"[{timestamp}] Inventory change: {update}\n"
+        self.inventory_text.config(state="normal")
+        self.inventory_text.insert("end", "".join(lines))
         
-        self.inventory_text.insert("end", msg)
+        # Keep the log widget bounded during update storms
+        excess = int(self.inventory_text.index("end-1c").split(".")[0]) - INVENTORY_LOG_LINES
+        if excess > 0:
+            self.inventory_text.delete("1.0", f"{excess + 1}.0")
         self.inventory_text.see("end")
         self.inventory_text.config(state="disabled")
-        
-        # Refresh product list if needed
-        if action in ("update", "add"):
-            self.load_products()
-        
-        # Process any pending orders
-        self.process_new_orders()
 
-    def process_new_orders(self):
-        """Simulate order processing workflow"""
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Redis E-Commerce System")
+    parser.add_argument("--process-orders", action="store_true",
+                        help="run the headless order processor instead of the UI")
+    parser.add_argument("--workers", type=int, default=4,
+                        help="number of order worker threads (default: 4)")
+    parser.add_argument("--import", dest="import_path", metavar="PATH",
+                        help="bulk import a .csv or .jsonl catalog instead of starting the UI")
+    parser.add_argument("--batch-size", type=int,
+                        help="orders per XREADGROUP call (default: 50) or "
+                             "products per import batch (default: 1000)")
+    parser.add_argument("--metrics-file", metavar="PATH",
+                        help="periodically write Prometheus latency metrics to this file")
+    parser.add_argument("--metrics-port", type=int,
+                        help="serve Prometheus latency metrics on localhost:PORT/metrics")
+    parser.add_argument("--host", default=SETTINGS.host,
+                        help="Redis host, or any cluster node with --cluster (default: $REDIS_HOST or localhost)")
+    parser.add_argument("--port", type=int, default=SETTINGS.port,
+                        help="Redis port (default: $REDIS_PORT or 6379)")
+    parser.add_argument("--cluster", action="store_true", default=SETTINGS.cluster,
+                        help="connect to a Redis Cluster (default: $REDIS_CLUSTER)")
+    parser.add_argument("--order-shards", type=int, default=SETTINGS.order_shards,
+                        help="number of order streams orders are spread over (default: $ORDER_SHARDS or 1)")
+    args = parser.parse_args()
+    
+    SETTINGS.host = args.host
+    SETTINGS.port = args.port
+    SETTINGS.cluster = args.cluster
+    SETTINGS.order_shards = args.order_shards
+    
+    REGISTRY.app = "ecommerce"
+    REGISTRY.start_exporter(path=args.metrics_file, port=args.metrics_port)
+    
+    if args.import_path:
+        CatalogImporter(
+            connect_redis(),
+            batch_size=args.batch_size or 1000
+        ).import_file(args.import_path)
+    elif args.process_orders:
+        OrderProcessor(
+            connect_redis(),
+            workers=args.workers,
+            batch_size=args.batch_size or 50
+        ).run_forever()
+    else:
+        root = tk.Tk()
         try:
-            orders = self.redis.xread({"orders": "0-0"}, count=1, block=0)
-            if orders:
-                stream, messages = orders[0]
-                for message_id, message_data in messages:
-                    # Check inventory
-                    pid = message_data["product_id"]
-                    quantity = int(message_data["quantity"])
-                    product = self.redis.json().get(f"product:{pid}")
-                    
-                    if product and product["inventory"] >= quantity:
-                        # Update inventory
-                        new_stock = product["inventory"] - quantity
-                        self.update_product_in_redis(pid, {"inventory": new_stock})
-                        
-                        # Update order status
-                        self.redis.xadd("orders", {
-                            "order_id": message_data["order_id"],
-                            "product_id": pid,
-                            "quantity": quantity,
-                            "status": "fulfilled"
-                        })
-                        
-                        # Update UI
-                        self.load_orders()
-                        self.status_var.set(f"🔄 Processed order {message_data['order_id']}")
-                    else:
-                        # Mark as failed
-                        self.redis.xadd("orders", {
-                            "order_id": message_data["order_id"],
-                            "product_id": pid,
-                            "quantity": quantity,
-                            "status": "failed (insufficient stock)"
-                        })
+            app = ECommerceApp(root)
+            root.mainloop()
         except Exception as e:
-            self.status_var.set(f"❌ Order processing error: {str(e)}")
-
-if __name__ == "__main__":
-    root = tk.Tk()
-    try:
-        app = ECommerceApp(root)
-        root.mainloop()
-    except Exception as e:
-        messagebox.showerror("Fatal Error", f"Application failed to start:\n{str(e)}")
-        root.destroy()
\ No newline at end of file
+            messagebox.showerror("Fatal Error", f"Application failed to start:\n{str(e)}")
+            root.destroy()
\ No newline at end of file
@@ -0,0 +1,111 @@
+# embedding_cache.py - Two-tier memoization of sentence embeddings
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
+from metrics import REGISTRY
+
+# Entries kept in the in-process tier
+EMBEDDING_CACHE_SIZE = 10000
+
+# Texts sent to the model per encode() call on a miss
+ENCODE_BATCH_SIZE = 64
+
+# Seconds an embedding is kept in the Redis tier; queries typed once must not pile up
+EMBEDDING_TTL = 86400
+
+class EmbeddingCache:
+    """Memoizes model.encode: an in-process LRU in front of Redis raw float32 bytes
+
+    Redis keys are emb:<model_name>:<sha256 of the text>, so every process
+    using the same model shares the tier and entries survive restarts. They
+    expire ttl seconds after being encoded. redis_client must be created
+    with decode_responses=False. Thread-safe.
+    """
+
+    def __init__(self, model, model_name, redis_client, max_size=EMBEDDING_CACHE_SIZE,
+                 ttl=EMBEDDING_TTL, metrics=REGISTRY):
+        self.model = model
+        self.model_name = model_name
+        self.redis = redis_client
+        self.max_size = max_size
+        self.ttl = ttl
+        self.metrics = metrics
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.memory_hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+
+    def key(self, text):
+        return f"emb:{self.model_name}:{hashlib.sha256(text.encode()).hexdigest()}"
+
+    def encode(self, text):
+        """Embedding of one text as a float32 vector"""
+        return self.encode_many([text])[0]
+
+    def encode_many(self, texts, batch_size=ENCODE_BATCH_SIZE):
+        """Embeddings of texts as a float32 matrix; only texts seen nowhere reach the model"""
+        keys = [self.key(text) for text in texts]
+        vectors = {}
+        
+        with self.lock:
+            for key in keys:
+                vector = self.entries.get(key)
+                if vector is not None:
+                    self.entries.move_to_end(key)
+                    vectors[key] = vector
+        memory_hits = len(vectors)
+        
+        # Separate GETs in one pipeline, since MGET cannot span cluster slots
+        missing = [key for key in dict.fromkeys(keys) if key not in vectors]
+        if missing:
+            with self.redis.pipeline(transaction=False) as pipe:
+                for key in missing:
+                    pipe.get(key)
+                stored = pipe.execute()
+            for key, raw in zip(missing, stored):
+                if raw is not None:
+                    vectors[key] = np.frombuffer(raw, dtype=np.float32)
+        redis_hits = len(vectors) - memory_hits
+        
+        # Encode each distinct unknown text once
+        unknown = {key: text for key, text in zip(keys, texts) if key not in vectors}
+        if unknown:
+            with self.metrics.time("model_encode"):
+                encoded = self.model.encode(list(unknown.values()), batch_size=batch_size)
+            with self.redis.pipeline(transaction=False) as pipe:
+                for key, vector in zip(unknown, np.asarray(encoded, dtype=np.float32)):
+                    vectors[key] = vector
+                    pipe.set(key, vector.tobytes(), ex=self.ttl)
+                pipe.execute()
+        
+        with self.lock:
+            self.memory_hits += memory_hits
+            self.redis_hits += redis_hits
+            self.misses += len(unknown)
+            for key in keys:
+                self.entries[key] = vectors[key]
+                self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+        
+        return np.stack([vectors[key] for key in keys]) if keys else np.empty((0, 0), dtype=np.float32)
+
+    def stats(self):
+        """Hit counters per tier and the overall hit rate"""
+        total = self.memory_hits + self.redis_hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "redis_hits": self.redis_hits,
+            "misses": self.misses,
+            "hit_rate": (self.memory_hits + self.redis_hits) / total if total else 0.0
+        }
+
+    def summary(self):
+        """Hit counters formatted for a status bar"""
+        stats = self.stats()
+        return (
+            f"Embeddings: {stats['hit_rate'] * 100:.1f}% hits "
+            f"({stats['memory_hits']} memory, {stats['redis_hits']} Redis, {stats['misses']} encoded)"
+        )
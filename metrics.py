@@ -0,0 +1,209 @@
+# metrics.py - Latency histograms with Prometheus text export for both apps
+import asyncio
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Histogram bucket upper bounds in seconds
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+COMMAND_METRIC = "redis_command_duration_seconds"
+OPERATION_METRIC = "operation_duration_seconds"
+HELP = {
+    COMMAND_METRIC: "Latency of Redis commands and pipelines as seen by the client",
+    OPERATION_METRIC: "Latency of logical application operations"
+}
+
+class Histogram:
+    """Fixed-bucket latency histogram"""
+
+    def __init__(self):
+        self.counts = [0] * len(LATENCY_BUCKETS)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds):
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if seconds <= bound:
+                self.counts[i] += 1
+                break
+        self.count += 1
+        self.sum += seconds
+
+    def quantile(self, q):
+        """Estimate a quantile by interpolating inside its bucket"""
+        if not self.count:
+            return None
+        target = q * self.count
+        seen = 0
+        lower = 0.0
+        for bound, count in zip(LATENCY_BUCKETS, self.counts):
+            if count and seen + count >= target:
+                return lower + (bound - lower) * (target - seen) / count
+            seen += count
+            lower = bound
+        # Beyond the largest bucket
+        return LATENCY_BUCKETS[-1]
+
+class MetricsRegistry:
+    """Thread-safe collection of labelled latency histograms"""
+
+    def __init__(self, app="app"):
+        self.app = app
+        self.histograms = {}
+        self.lock = threading.Lock()
+
+    def observe(self, metric, label, name, seconds):
+        with self.lock:
+            key = (metric, label, name)
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(seconds)
+
+    def command(self, name, seconds):
+        self.observe(COMMAND_METRIC, "command", name, seconds)
+
+    def operation(self, name, seconds):
+        self.observe(OPERATION_METRIC, "operation", name, seconds)
+
+    @contextmanager
+    def time(self, operation):
+        """Time a block as a logical operation"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.operation(operation, time.perf_counter() - start)
+
+    def summary(self, operations, q=0.95):
+        """One-line p95 summary of the given operations for a status bar"""
+        parts = []
+        with self.lock:
+            for name in operations:
+                histogram = self.histograms.get((OPERATION_METRIC, "operation", name))
+                if histogram and histogram.count:
+                    parts.append(f"{name} {histogram.quantile(q) * 1000:.1f}ms")
+        return "p95: " + (" | ".join(parts) if parts else "no samples yet")
+
+    def render(self):
+        """Render all histograms in the Prometheus text exposition format"""
+        lines = []
+        with self.lock:
+            for metric in (COMMAND_METRIC, OPERATION_METRIC):
+                keys = sorted(key for key in self.histograms if key[0] == metric)
+                if not keys:
+                    continue
+                lines.append(f"# HELP {metric} {HELP[metric]}")
+                lines.append(f"# TYPE {metric} histogram")
+                for _, label, name in keys:
+                    histogram = self.histograms[(metric, label, name)]
+                    labels = f'app="{self.app}",{label}="{name}"'
+                    cumulative = 0
+                    for bound, count in zip(LATENCY_BUCKETS, histogram.counts):
+                        cumulative += count
+                        lines.append(f'{metric}_bucket{{{labels},le="{bound}"}} {cumulative}')
+                    lines.append(f'{metric}_bucket{{{labels},le="+Inf"}} {histogram.count}')
+                    lines.append(f"{metric}_sum{{{labels}}} {histogram.sum:.6f}")
+                    lines.append(f"{metric}_count{{{labels}}} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def write_file(self, path):
+        """Atomically write the exposition text, e.g. for node_exporter's textfile collector"""
+        tmp = f"{path}.tmp"
+        with open(tmp, "w") as f:
+            f.write(self.render())
+        os.replace(tmp, path)
+
+    def start_exporter(self, path=None, port=None, interval=5):
+        """Export to a file every interval seconds and/or serve /metrics on localhost:port"""
+        if path:
+            def writer():
+                while True:
+                    try:
+                        self.write_file(path)
+                    except OSError as e:
+                        print(f"Metrics export error: {str(e)}")
+                    time.sleep(interval)
+            threading.Thread(target=writer, daemon=True).start()
+
+        if port:
+            registry = self
+
+            class MetricsHandler(BaseHTTPRequestHandler):
+                def do_GET(self):
+                    body = registry.render().encode()
+                    self.send_response(200)
+                    self.send_header("Content-Type", "text/plain; version=0.0.4")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+
+                def log_message(self, format, *args):
+                    pass
+
+            server = ThreadingHTTPServer(("127.0.0.1", port), MetricsHandler)
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+
+# Default registry shared by everything in the process
+REGISTRY = MetricsRegistry()
+
+def command_name(args):
+    """Metric label for a command: its name, e.g. GET or JSON.MGET"""
+    return str(args[0]).split(" ")[0].upper() if args else "UNKNOWN"
+
+def instrument_redis(client, registry=REGISTRY):
+    """Record latency for every command and pipeline sent through a redis-py client
+
+    Works for both redis.Redis and redis.asyncio.Redis. Module commands
+    (json(), ft()) go through execute_command and are covered too.
+    """
+    execute_command = client.execute_command
+    pipeline = client.pipeline
+
+    if asyncio.iscoroutinefunction(execute_command):
+        async def timed_command(*args, **options):
+            start = time.perf_counter()
+            try:
+                return await execute_command(*args, **options)
+            finally:
+                registry.command(command_name(args), time.perf_counter() - start)
+
+        def timed_pipeline(*args, **kwargs):
+            pipe = pipeline(*args, **kwargs)
+            execute = pipe.execute
+
+            async def timed_execute(*exec_args, **exec_kwargs):
+                start = time.perf_counter()
+                try:
+                    return await execute(*exec_args, **exec_kwargs)
+                finally:
+                    registry.command("PIPELINE", time.perf_counter() - start)
+            pipe.execute = timed_execute
+            return pipe
+    else:
+        def timed_command(*args, **options):
+            start = time.perf_counter()
+            try:
+                return execute_command(*args, **options)
+            finally:
+                registry.command(command_name(args), time.perf_counter() - start)
+
+        def timed_pipeline(*args, **kwargs):
+            pipe = pipeline(*args, **kwargs)
+            execute = pipe.execute
+
+            def timed_execute(*exec_args, **exec_kwargs):
+                start = time.perf_counter()
+                try:
+                    return execute(*exec_args, **exec_kwargs)
+                finally:
+                    registry.command("PIPELINE", time.perf_counter() - start)
+            pipe.execute = timed_execute
+            return pipe
+
+    client.execute_command = timed_command
+    client.pipeline = timed_pipeline
+    return client
@@ -0,0 +1,196 @@
+# precision_report.py - Memory saved and recall@k lost by reduced-precision vectors
+import argparse
+import importlib.util
+import json
+import os
+import random
+import time
+from itertools import islice
+import numpy as np
+from redis.commands.search.field import TextField, VectorField
+from redis.commands.search.indexDefinition import IndexDefinition, IndexType
+from redis_engine import RedisEngine, RedisSettings
+from vector_codec import VECTOR_TYPES
+
+# The AI module's file name is not importable with a plain import
+spec = importlib.util.spec_from_file_location(
+    "ai",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "real-time-ai-innovators.py")
+)
+ai = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(ai)
+
+# Sample copies of the corpus live under their own prefix, one per vector type
+SAMPLE_PREFIX = "precision:"
+
+def load_corpus(raw_client, settings, limit):
+    """Up to limit doc: keys and their vectors as a float32 matrix"""
+    field, codec = settings.field(), settings.codec()
+    keys = list(islice(raw_client.scan_iter(match="doc:*", count=1000), limit))
+    with raw_client.pipeline(transaction=False) as pipe:
+        for key in keys:
+            pipe.hget(key, field)
+        stored = pipe.execute()
+    vectors = [codec.decode(raw) for raw in stored if raw]
+    if not vectors:
+        raise SystemExit(f"No doc: hashes with a {field} field to sample")
+    return np.stack(vectors)
+
+def exact_neighbours(matrix, queries, k):
+    """Row numbers of each query's true k nearest neighbours by cosine, excluding itself"""
+    normalized = matrix / np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+    truth = []
+    for row in queries:
+        similarity = normalized @ normalized[row]
+        similarity[row] = -np.inf
+        truth.append(set(np.argsort(-similarity)[:k].tolist()))
+    return truth
+
+def build_sample(redis_client, raw_client, settings, matrix, report):
+    """Copy the vectors into hashes indexed with settings; returns (prefix, index name)"""
+    name = settings.vector_type.lower()
+    prefix = f"{SAMPLE_PREFIX}{name}:"
+    index = f"precision_{name}"
+    try:
+        redis_client.ft(index).dropindex(delete_documents=True)
+    except Exception:
+        pass
+    redis_client.ft(index).create_index(
+        (
+            TextField("id"),
+            TextField("title"),
+            TextField("content"),
+            VectorField(settings.field(), settings.algorithm, settings.attributes())
+        ),
+        definition=IndexDefinition(prefix=[prefix], index_type=IndexType.HASH)
+    )
+
+    codec = settings.codec()
+    for start in range(0, len(matrix), 1000):
+        with raw_client.pipeline(transaction=False) as pipe:
+            for row in range(start, min(start + 1000, len(matrix))):
+                pipe.hset(f"{prefix}{row}", mapping={
+                    "id": row,
+                    "title": "",
+                    "content": "",
+                    settings.field(): codec.encode(matrix[row])
+                })
+            pipe.execute()
+    ai.wait_for_index(redis_client, index, report)
+    return prefix, index
+
+def memory_usage(redis_client, prefix, count, index):
+    """Bytes used by the sample hashes and by the vector index"""
+    with redis_client.pipeline(transaction=False) as pipe:
+        for row in range(count):
+            pipe.memory_usage(f"{prefix}{row}", samples=0)
+        key_bytes = sum(size or 0 for size in pipe.execute())
+    info = redis_client.ft(index).info()
+    index_bytes = float(info.get("vector_index_sz_mb", 0)) * 1024 * 1024
+    return key_bytes, index_bytes
+
+def measure_recall(engine, index, settings, matrix, queries, truth, k, ef_runtime):
+    """Mean recall@k against the exact neighbours, and p50 query latency in ms"""
+    field, codec = settings.field(), settings.codec()
+    recalls = []
+    latencies = []
+    for row, expected in zip(queries, truth):
+        start = time.perf_counter()
+        results = engine.call(engine.knn_search(
+            index, matrix[row].tobytes(), k + 1, ef_runtime, field, codec
+        ))
+        latencies.append(time.perf_counter() - start)
+        # The query vector is in the sample; leave it out as the ground truth does
+        found = [int(doc["id"].rsplit(":", 1)[1]) for doc in results]
+        found = [n for n in found if n != row][:k]
+        recalls.append(len(expected.intersection(found)) / k)
+    latencies.sort()
+    return float(np.mean(recalls)), round(latencies[len(latencies) // 2] * 1000, 3)
+
+def run_report(args):
+    settings = RedisSettings(args.host, args.port, cluster=args.cluster)
+    redis_client = settings.connect()
+    raw_client = settings.connect(decode_responses=False)
+    engine = RedisEngine(settings=settings)
+    report = print if args.verbose else (lambda msg: None)
+
+    current = ai.VectorIndexSettings.load(redis_client)
+    matrix = load_corpus(raw_client, current, args.docs)
+    queries = random.Random(args.seed).sample(range(len(matrix)), min(args.queries, len(matrix)))
+    truth = exact_neighbours(matrix, queries, args.k)
+    ef_runtime = (args.ef_runtime or current.ef_runtime) if current.is_hnsw() else None
+    try:
+        corpus_docs = int(redis_client.ft(ai.AI_INDEX).info()["num_docs"])
+    except Exception:
+        corpus_docs = len(matrix)
+
+    results = {}
+    for vector_type in ["FLOAT32"] + [t for t in args.types if t != "FLOAT32"]:
+        sample = ai.VectorIndexSettings(
+            current.algorithm, current.m, current.ef_construction, current.ef_runtime, vector_type
+        )
+        prefix, index = build_sample(redis_client, raw_client, sample, matrix, report)
+        try:
+            key_bytes, index_bytes = memory_usage(redis_client, prefix, len(matrix), index)
+            recall, p50_ms = measure_recall(engine, index, sample, matrix, queries, truth, args.k, ef_runtime)
+        finally:
+            if not args.keep:
+                redis_client.ft(index).dropindex(delete_documents=True)
+        results[vector_type] = {
+            "bytes_per_vector": sample.codec().bytes_per_vector(matrix.shape[1]),
+            "key_bytes_per_doc": round(key_bytes / len(matrix), 1),
+            "index_bytes_per_doc": round(index_bytes / len(matrix), 1),
+            f"recall_at_{args.k}": round(recall, 4),
+            "p50_ms": p50_ms
+        }
+    engine.close()
+
+    baseline = results["FLOAT32"]
+    baseline_bytes = baseline["key_bytes_per_doc"] + baseline["index_bytes_per_doc"]
+    for vector_type, result in results.items():
+        saved = baseline_bytes - result["key_bytes_per_doc"] - result["index_bytes_per_doc"]
+        result["saved_bytes_per_doc"] = round(saved, 1)
+        result["saved_pct"] = round(saved / baseline_bytes * 100, 1) if baseline_bytes else None
+        result["projected_saved_mb"] = round(saved * corpus_docs / 1024 / 1024, 2)
+        result[f"recall_at_{args.k}_lost"] = round(baseline[f"recall_at_{args.k}"] - result[f"recall_at_{args.k}"], 4)
+
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "config": vars(args),
+        "index": current.describe(),
+        "sample_docs": len(matrix),
+        "corpus_docs": corpus_docs,
+        "queries": len(queries),
+        "baseline_is_exact": current.vector_type == "FLOAT32",
+        "types": results
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Compare reduced-precision vector storage with FLOAT32 on a sample of the ai_index corpus"
+    )
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=6379)
+    parser.add_argument("--cluster", action="store_true",
+                        help="treat --host/--port as a seed node of a Redis Cluster")
+    parser.add_argument("--types", nargs="+", type=str.upper, choices=VECTOR_TYPES, default=list(VECTOR_TYPES),
+                        help="vector types to compare; FLOAT32 is always measured as the baseline")
+    parser.add_argument("--docs", type=int, default=10000, help="documents sampled from doc:* (default: 10000)")
+    parser.add_argument("--queries", type=int, default=200,
+                        help="sampled documents used as queries (default: 200)")
+    parser.add_argument("--k", type=int, default=10, help="neighbours per query for recall@k (default: 10)")
+    parser.add_argument("--ef-runtime", type=int,
+                        help="HNSW EF_RUNTIME for the queries (default: the index's saved value)")
+    parser.add_argument("--seed", type=int, default=0, help="query sampling seed (default: 0)")
+    parser.add_argument("--keep", action="store_true",
+                        help="keep the precision_* sample indexes and hashes for inspection")
+    parser.add_argument("--verbose", action="store_true", help="print index build progress")
+    parser.add_argument("--output", help="write the JSON report to this file instead of stdout")
+    args = parser.parse_args()
+
+    report = json.dumps(run_report(args), indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(report + "\n")
+    else:
+        print(report)
@@ -1,30 +1,351 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
-import numpy as np
-from redis import Redis
 from redis.commands.search.field import TextField, VectorField
-from redis.commands.search.query import Query
+from redis.commands.search.indexDefinition import IndexDefinition, IndexType
 from sentence_transformers import SentenceTransformer
+import argparse
+import csv
 import json
+import queue
 import time
-import threading
 from datetime import datetime
+from metrics import REGISTRY
+from redis_engine import (
+    RedisEngine, SETTINGS, QUERY_CACHE_INDEX, QUERY_CACHE_THRESHOLD, create_query_cache_index, stable_hash
+)
+from snapshot import EmbeddingSnapshot, content_stamp
+from embedding_cache import EmbeddingCache, ENCODE_BATCH_SIZE
+from vector_codec import VectorCodec, VECTOR_TYPES
+
+# Engine callbacks are run on the Tk thread at this interval
+UI_FRAME_MS = 33
+METRICS_INTERVAL_MS = 2000
+
+# Search-as-you-type waits for a pause in typing and a few characters
+SEARCH_DEBOUNCE_MS = 300
+SEARCH_MIN_CHARS = 3
+
+# Operations shown in the live latency summary
+METRICS_SUMMARY = ("semantic_search", "cache_lookup", "encode", "model_encode", "knn_search", "rerank", "ui_frame")
+
+MODEL_NAME = "all-MiniLM-L6-v2"
+
+# Bump whenever the ai_index definition changes so it is rebuilt on start
+AI_INDEX_VERSION = "2"
+
+# Searches query this alias; it points at the physical index built from the current settings
+AI_INDEX = "ai_index"
+AI_INDEX_SETTINGS_KEY = "ai:index_settings"
+VECTOR_ALGORITHMS = ("FLAT", "HNSW")
+
+# HNSW defaults: graph degree, build-time and query-time candidate list sizes
+HNSW_M = 16
+HNSW_EF_CONSTRUCTION = 200
+HNSW_EF_RUNTIME = 10
+
+# How often a rebuild checks whether the new index has caught up
+INDEX_BUILD_POLL_S = 0.5
+
+# Stamp of the corpus currently written to Redis; unchanged corpora are not rewritten
+CORPUS_VERSION_KEY = "ai:corpus_version"
+
+class VectorIndexSettings:
+    """Vector index algorithm, precision and parameters, persisted next to the index
+
+    M and EF_CONSTRUCTION shape the HNSW graph, so changing them means a
+    rebuild; EF_RUNTIME is only the default sent with each query. Each
+    vector type is stored in its own hash field, so a precision change can
+    fill the new field while the old index still serves searches.
+    """
+
+    def __init__(self, algorithm="FLAT", m=HNSW_M, ef_construction=HNSW_EF_CONSTRUCTION,
+                 ef_runtime=HNSW_EF_RUNTIME, vector_type="FLOAT32"):
+        self.algorithm = algorithm.upper()
+        self.m = int(m)
+        self.ef_construction = int(ef_construction)
+        self.ef_runtime = int(ef_runtime)
+        self.vector_type = vector_type.upper()
+
+    @classmethod
+    def load(cls, redis_client):
+        """Settings the current index was built with (FLAT if none were saved)"""
+        saved = redis_client.hgetall(AI_INDEX_SETTINGS_KEY)
+        return cls(**saved) if saved else cls()
+
+    def save(self, redis_client):
+        redis_client.hset(AI_INDEX_SETTINGS_KEY, mapping={
+            "algorithm": self.algorithm,
+            "m": self.m,
+            "ef_construction": self.ef_construction,
+            "ef_runtime": self.ef_runtime,
+            "vector_type": self.vector_type
+        })
+
+    def is_hnsw(self):
+        return self.algorithm == "HNSW"
+
+    def field(self):
+        """Hash field holding the vectors; FLOAT32 keeps the original name"""
+        return "embedding" if self.vector_type == "FLOAT32" else f"embedding_{self.vector_type.lower()}"
+
+    def codec(self):
+        return VectorCodec(self.vector_type)
+
+    def attributes(self):
+        attributes = {"TYPE": self.vector_type, "DIM": 384, "DISTANCE_METRIC": "COSINE"}
+        if self.is_hnsw():
+            attributes.update({"M": self.m, "EF_CONSTRUCTION": self.ef_construction})
+        return attributes
+
+    def index_name(self):
+        """Physical index name; it changes with anything that needs a rebuild"""
+        return f"{AI_INDEX}:{stable_hash(AI_INDEX_VERSION, self.algorithm, self.attributes())[:12]}"
+
+    def describe(self):
+        if self.is_hnsw():
+            return (f"HNSW {self.vector_type} M={self.m} "
+                    f"EF_CONSTRUCTION={self.ef_construction} EF_RUNTIME={self.ef_runtime}")
+        return f"FLAT {self.vector_type}"
+
+def index_target(redis_client):
+    """Name of the index behind the ai_index alias, or None if there is none"""
+    try:
+        return redis_client.ft(AI_INDEX).info()["index_name"]
+    except Exception:
+        return None
+
+def wait_for_index(redis_client, name, report=print):
+    """Block until name has indexed every existing doc: hash"""
+    while True:
+        info = redis_client.ft(name).info()
+        percent = float(info.get("percent_indexed", 1))
+        if not int(info.get("indexing", 0)) and percent >= 1:
+            return
+        report(f"Building {name}: {percent:.0%} indexed")
+        time.sleep(INDEX_BUILD_POLL_S)
+
+def convert_vectors(raw_client, source, target, drop_source=False, batch_size=500, report=print):
+    """Re-encode every doc: hash's vectors from source's field into target's
+
+    raw_client must be created with decode_responses=False. With
+    drop_source the old field is deleted in the same pipeline.
+    """
+    source_field, target_field = source.field(), target.field()
+    source_codec, target_codec = source.codec(), target.codec()
+    converted = 0
+
+    def convert(keys):
+        with raw_client.pipeline(transaction=False) as pipe:
+            for key in keys:
+                pipe.hget(key, source_field)
+            stored = pipe.execute()
+        with raw_client.pipeline(transaction=False) as pipe:
+            for key, raw in zip(keys, stored):
+                if raw is None:
+                    continue
+                pipe.hset(key, target_field, target_codec.encode(source_codec.decode(raw)))
+                if drop_source:
+                    pipe.hdel(key, source_field)
+            pipe.execute()
+        return sum(raw is not None for raw in stored)
+
+    keys = []
+    for key in raw_client.scan_iter(match="doc:*", count=batch_size):
+        keys.append(key)
+        if len(keys) >= batch_size:
+            converted += convert(keys)
+            keys = []
+    if keys:
+        converted += convert(keys)
+    report(f"Converted {converted} vectors from {source_field} to {target_field}")
+
+def rebuild_index(redis_client, settings, report=print, raw_client=None):
+    """Build an index for settings next to the current one, then swap the alias over
+
+    Searches keep using the old index until the new one has indexed every
+    document, so they are never interrupted. The old index is dropped
+    afterwards; the documents stay. A precision change needs raw_client
+    (decode_responses=False) to fill the new vector field before the build
+    and to convert stragglers and delete the old field after the swap.
+    """
+    target = settings.index_name()
+    current = index_target(redis_client)
+    previous = VectorIndexSettings.load(redis_client)
+    reencode = current is not None and previous.field() != settings.field()
+    if current != target:
+        if reencode:
+            convert_vectors(raw_client, previous, settings, report=report)
+        try:
+            redis_client.ft(target).info()
+        except Exception:
+            # Limited to doc: so cached query embeddings are never returned as documents
+            redis_client.ft(target).create_index(
+                (
+                    TextField("id"),
+                    TextField("title"),
+                    TextField("content"),
+                    VectorField(settings.field(), settings.algorithm, settings.attributes())
+                ),
+                definition=IndexDefinition(prefix=["doc:"], index_type=IndexType.HASH)
+            )
+        wait_for_index(redis_client, target, report)
+
+        if current is None:
+            redis_client.ft(target).aliasadd(AI_INDEX)
+        elif current == AI_INDEX:
+            # An index from before aliases holds the name itself; replace it in one MULTI
+            with redis_client.pipeline() as pipe:
+                pipe.ft(AI_INDEX).dropindex(delete_documents=False)
+                pipe.ft(target).aliasadd(AI_INDEX)
+                pipe.execute()
+        else:
+            redis_client.ft(target).aliasupdate(AI_INDEX)
+            redis_client.ft(current).dropindex(delete_documents=False)
+    settings.save(redis_client)
+    if reencode:
+        # Picks up documents written in the old format during the build
+        convert_vectors(raw_client, previous, settings, drop_source=True, report=report)
+    report(f"{AI_INDEX} -> {target} ({settings.describe()})")
+
+def ensure_indexes(redis_client, report=print):
+    """Create the document and query cache indexes, rebuilding an outdated ai_index
+
+    The saved settings are kept, so instances started later follow a
+    migration instead of reverting it.
+    """
+    settings = VectorIndexSettings.load(redis_client)
+    if index_target(redis_client) != settings.index_name():
+        rebuild_index(redis_client, settings, report)
+
+    try:
+        redis_client.ft(QUERY_CACHE_INDEX).info()
+    except Exception:
+        create_query_cache_index(redis_client)
+    return settings
+
+def document_hash(doc):
+    """Hash of everything a document's stored fields and embedding depend on"""
+    return stable_hash(MODEL_NAME, doc.get("title", ""), doc["content"])
+
+# Corpus Ingestion ==========================================
+
+class CorpusIngestor:
+    """Stream a JSONL or CSV corpus into doc:* hashes, embedding only changed documents
+
+    Rows are read lazily and handled batch_size at a time: one pipelined
+    round trip fetches the stored content hashes, only documents whose
+    hash differs are embedded (encode_batch_size texts per model call) and
+    written in one more pipeline. Memory stays bounded by the batch size
+    whatever the corpus size. The model is called directly rather than
+    through the embedding cache, whose Redis tier would store every
+    document's vector a second time next to the doc: hash.
+    """
+
+    def __init__(self, redis_client, model, vector_index=None, batch_size=512,
+                 encode_batch_size=ENCODE_BATCH_SIZE, report=print):
+        self.redis = redis_client
+        self.model = model
+        self.vector_index = vector_index or VectorIndexSettings()
+        self.batch_size = batch_size
+        self.encode_batch_size = encode_batch_size
+        self.report = report
+        self.read = 0
+        self.written = 0
+        self.skipped = 0
+
+    def ingest_file(self, path):
+        """Ingest a .csv file (with a header row) or a .jsonl file"""
+        with open(path, newline="", encoding="utf-8") as f:
+            if path.lower().endswith(".csv"):
+                rows = csv.DictReader(f)
+            else:
+                rows = (json.loads(line) for line in f if line.strip())
+            return self.ingest_rows(rows)
+
+    def ingest_rows(self, rows):
+        """Ingest rows with id, content and optionally title keys"""
+        start = time.monotonic()
+        batch = {}
+        for row in rows:
+            # Later rows for the same id win, as they would when written one by one
+            batch[str(row["id"])] = row
+            if len(batch) >= self.batch_size:
+                self.ingest_batch(batch)
+                self.report_progress(start)
+                batch = {}
+        
+        if batch:
+            self.ingest_batch(batch)
+            self.report_progress(start)
+        return self.written
+
+    def ingest_batch(self, batch):
+        """Embed and write the documents of one batch whose content changed"""
+        hashes = {doc_id: document_hash(row) for doc_id, row in batch.items()}
+        with self.redis.pipeline(transaction=False) as pipe:
+            for doc_id in batch:
+                pipe.hget(f"doc:{doc_id}", "content_hash")
+            stored = pipe.execute()
+        
+        changed = [
+            doc_id for doc_id, stored_hash in zip(batch, stored)
+            if stored_hash != hashes[doc_id]
+        ]
+        self.read += len(batch)
+        self.skipped += len(batch) - len(changed)
+        if not changed:
+            return
+        
+        with REGISTRY.time("encode"):
+            matrix = self.model.encode(
+                [batch[doc_id]["content"] for doc_id in changed],
+                batch_size=self.encode_batch_size
+            )
+        field, codec = self.vector_index.field(), self.vector_index.codec()
+        with self.redis.pipeline(transaction=False) as pipe:
+            for doc_id, embedding in zip(changed, matrix):
+                row = batch[doc_id]
+                pipe.hset(f"doc:{doc_id}", mapping={
+                    "id": doc_id,
+                    "title": row.get("title", ""),
+                    "content": row["content"],
+                    "content_hash": hashes[doc_id],
+                    field: codec.encode(embedding)
+                })
+            pipe.execute()
+        self.written += len(changed)
+
+    def report_progress(self, start):
+        """Report the running ingest rate"""
+        elapsed = time.monotonic() - start
+        rate = self.read / elapsed if elapsed > 0 else 0
+        self.report(
+            f"Read {self.read} documents ({self.written} written, {self.skipped} unchanged, {rate:.0f} docs/s)"
+        )
 
 class AIRecommendationApp:
-    def __init__(self, root):
+    def __init__(self, root, cache_threshold=QUERY_CACHE_THRESHOLD):
         self.root = root
+        self.cache_threshold = cache_threshold
         self.root.title("AI Recommendation Engine with Semantic Caching")
         self.root.geometry("1200x700")
         self.root.configure(bg="#f0f2f5")
         
         # Initialize connections
-        self.redis = Redis(
-            host='localhost',
-            port=6379,
-            decode_responses=True,
-            socket_connect_timeout=3
-        )
-        self.model = SentenceTransformer('all-MiniLM-L6-v2')
+        self.redis = SETTINGS.connect()
+        self.model = SentenceTransformer(MODEL_NAME)
+        
+        # Every encode goes through the memo; its Redis tier stores raw bytes
+        self.embeddings = EmbeddingCache(self.model, MODEL_NAME, SETTINGS.connect(decode_responses=False))
+        self.embedding_snapshot = EmbeddingSnapshot(source=MODEL_NAME)
+        
+        # Searches and cache operations run on the engine, off the Tk thread
+        self.engine = RedisEngine(callback_queue=queue.Queue())
+        self.search_future = None
+        self.search_after = None
+        # Text of the search on screen or in flight, so unchanged text is not searched again
+        self.searched_query = None
+        self.vector_index = VectorIndexSettings()
         
         # Setup UI and data
         self.setup_ui()
@@ -110,6 +431,35 @@ class AIRecommendationApp:
         )
         self.search_entry.pack(fill="x", pady=5)
         self.search_entry.bind("<Return>", self.on_search)
+        self.search_entry.bind("<KeyRelease>", self.on_search_keystroke)
+        
+        # HNSW candidate list size per query; larger is slower but finds more true neighbours
+        ef_frame = tk.Frame(search_frame, bg="#ffffff")
+        ef_frame.pack(fill="x")
+        tk.Label(
+            ef_frame,
+            text="EF_RUNTIME:",
+            font=("Helvetica", 10),
+            bg="#ffffff"
+        ).pack(side="left")
+        self.ef_runtime_var = tk.StringVar()
+        self.ef_runtime_spin = tk.Spinbox(
+            ef_frame,
+            from_=1,
+            to=1000,
+            increment=10,
+            width=6,
+            textvariable=self.ef_runtime_var
+        )
+        self.ef_runtime_spin.pack(side="left", padx=5)
+        self.index_mode_var = tk.StringVar(value="FLAT")
+        tk.Label(
+            ef_frame,
+            textvariable=self.index_mode_var,
+            font=("Helvetica", 9),
+            fg="#7f8c8d",
+            bg="#ffffff"
+        ).pack(side="left")
         
         tk.Button(
             search_frame,
@@ -119,6 +469,14 @@ class AIRecommendationApp:
             fg="white",
             font=("Helvetica", 10, "bold")
         ).pack(pady=5)
+        
+        self.search_as_you_type = tk.BooleanVar(value=True)
+        tk.Checkbutton(
+            search_frame,
+            text="Search as you type",
+            variable=self.search_as_you_type,
+            bg="#ffffff"
+        ).pack(anchor="w")
 
         # Cache Controls Frame
         cache_frame = tk.Frame(left_panel, bg="#ffffff", padx=10, pady=10)
@@ -192,25 +550,26 @@ class AIRecommendationApp:
             anchor="w",
             padx=20
         ).pack(side="bottom", fill="x")
+        
+        self.metrics_var = tk.StringVar(value=REGISTRY.summary(METRICS_SUMMARY))
+        tk.Label(
+            self.root,
+            textvariable=self.metrics_var,
+            font=("Helvetica", 9),
+            bg="#34495e",
+            fg="#a3d9ff",
+            anchor="w",
+            padx=20
+        ).pack(side="bottom", fill="x")
 
     def load_sample_data(self):
         """Initialize sample data with scalability in mind"""
         try:
-            # Create index if not exists
-            try:
-                self.redis.ft("ai_index").info()
-            except:
-                schema = (
-                    TextField("id"),
-                    TextField("title"),
-                    TextField("content"),
-                    VectorField("embedding", "FLAT", {
-                        "TYPE": "FLOAT32",
-                        "DIM": 384,
-                        "DISTANCE_METRIC": "COSINE"
-                    })
-                )
-                self.redis.ft("ai_index").create_index(schema)
+            self.vector_index = ensure_indexes(self.redis, report=self.status_var.set)
+            self.index_mode_var.set(self.vector_index.describe())
+            self.ef_runtime_var.set(str(self.vector_index.ef_runtime))
+            # FLAT indexes reject EF_RUNTIME
+            self.ef_runtime_spin.configure(state="normal" if self.vector_index.is_hnsw() else "disabled")
             
             # Sample documents
             sample_docs = [
@@ -221,22 +580,12 @@ class AIRecommendationApp:
                 {"id": "doc5", "title": "Computer Vision", "content": "Algorithms for image recognition and processing"}
             ]
             
-            # Load documents in pipeline for efficiency
-            with self.redis.pipeline() as pipe:
-                for doc in sample_docs:
-                    embedding = self.model.encode(doc["content"])
-                    pipe.hset(
-                        f"doc:{doc['id']}",
-                        mapping={
-                            "id": doc["id"],
-                            "title": doc["title"],
-                            "content": doc["content"],
-                            "embedding": embedding.astype(np.float32).tobytes()
-                        }
-                    )
-                pipe.execute()
-            
-            self.status_var.set(f"Loaded {len(sample_docs)} sample documents")
+            # Redis already holds this exact corpus and model's embeddings
+            corpus_version = content_stamp(MODEL_NAME, sample_docs)
+            if self.redis.get(CORPUS_VERSION_KEY) == corpus_version:
+                self.status_var.set(f"{len(sample_docs)} documents already loaded")
+            else:
+                self.write_corpus(sample_docs, corpus_version)
             
             # Initialize cache metrics
             self.redis.set("cache:hits", 0)
@@ -246,81 +595,143 @@ class AIRecommendationApp:
             messagebox.showerror("Initialization Error", f"Failed to load data: {str(e)}")
             self.root.destroy()
 
-    def on_search(self, event=None):
-        """Enhanced search with semantic caching and performance tracking"""
+    def write_corpus(self, docs, corpus_version):
+        """Write documents with embeddings, encoding only when the snapshot is stale"""
+        embeddings = self.embedding_snapshot.load_embeddings(corpus_version)
+        if embeddings is None:
+            with REGISTRY.time("encode"):
+                matrix = self.embeddings.encode_many([doc["content"] for doc in docs])
+            try:
+                self.embedding_snapshot.save_embeddings(corpus_version, [doc["id"] for doc in docs], matrix)
+            except OSError as e:
+                print(f"Embedding snapshot not saved: {str(e)}")
+            embeddings = dict(zip([doc["id"] for doc in docs], matrix))
+            source = "encoded"
+        else:
+            source = "from snapshot"
+        
+        # Load documents in one pipeline; not a MULTI, as they may span cluster slots
+        field, codec = self.vector_index.field(), self.vector_index.codec()
+        with self.redis.pipeline(transaction=False) as pipe:
+            for doc in docs:
+                pipe.hset(
+                    f"doc:{doc['id']}",
+                    mapping={
+                        "id": doc["id"],
+                        "title": doc["title"],
+                        "content": doc["content"],
+                        "content_hash": document_hash(doc),
+                        field: codec.encode(embeddings[doc["id"]])
+                    }
+                )
+            pipe.set(CORPUS_VERSION_KEY, corpus_version)
+            pipe.execute()
+        
+        self.status_var.set(f"Loaded {len(docs)} sample documents (embeddings {source})")
+
+    def on_search_keystroke(self, event):
+        """Restart the search-as-you-type timer on every edit of the query"""
+        if event.keysym in ("Return", "Escape") or not self.search_as_you_type.get():
+            return
+        # Shift, arrows, Tab and the like are released without changing the text
+        if self.search_entry.get().strip() == self.searched_query:
+            if self.search_after is not None:
+                self.root.after_cancel(self.search_after)
+                self.search_after = None
+            return
+        if self.search_after is not None:
+            self.root.after_cancel(self.search_after)
+        self.search_after = self.root.after(SEARCH_DEBOUNCE_MS, lambda: self.on_search(typed=True))
+
+    def on_search(self, event=None, typed=False):
+        """Submit a cached semantic search, cancelling any search still in flight"""
+        if self.search_after is not None:
+            self.root.after_cancel(self.search_after)
+            self.search_after = None
+        if self.search_future is not None:
+            # Drops its encode if still queued and stops it before the next Redis stage
+            self.search_future.cancel()
+            self.search_future = None
+            self.searched_query = None
+        
         query = self.search_entry.get().strip()
+        if typed and len(query) < SEARCH_MIN_CHARS:
+            return
         if not query:
             self.status_var.set("Please enter a search query")
             return
+        
+        ef_runtime = None
+        if self.vector_index.is_hnsw():
+            try:
+                ef_runtime = int(self.ef_runtime_var.get())
+            except ValueError:
+                ef_runtime = 0
+            if ef_runtime < 1:
+                self.status_var.set("EF_RUNTIME must be a positive whole number")
+                return
             
         start_time = time.time()
         self.status_var.set(f"Searching: {query[:30]}...")
-        self.root.update()
+        self.searched_query = query
         
-        try:
-            # Clear previous results
-            self.tree.delete(*self.tree.get_children())
-            
-            # Check semantic cache first
-            cache_key = f"cache:query:{self.get_query_hash(query)}"
-            cached_results = None
-            
-            if self.cache_enabled.get():
-                cached_results = self.redis.get(cache_key)
-                if cached_results:
-                    self.redis.incr("cache:hits")
-                    results = json.loads(cached_results)
-                    source = "cache"
-                else:
-                    self.redis.incr("cache:misses")
-            
-            if not cached_results:
-                # Compute fresh results
-                query_embedding = self.model.encode(query)
-                results = self.redis.ft("ai_index").search(
-                    Query("*=>[KNN 5 @embedding $vec AS score]")
-                    .return_fields("id", "title", "content", "score")
-                    .dialect(2),
-                    {"vec": query_embedding.astype(np.float32).tobytes()}
-                ).docs
-                
-                # Store in cache
-                if self.cache_enabled.get():
-                    serialized = json.dumps([{
-                        'id': doc.id,
-                        'title': doc.title,
-                        'content': doc.content,
-                        'score': doc.score
-                    } for doc in results])
-                    self.redis.setex(cache_key, 3600, serialized)  # Cache for 1 hour
-                
-                source = "database"
-            
-            # Display results
-            for doc in (results if cached_results else results):
-                score = float(doc['score'] if cached_results else doc.score)
-                self.tree.insert("", "end", values=(
-                    doc['id'] if cached_results else doc.id,
-                    doc['title'] if cached_results else doc.title,
-                    (doc['content'] if cached_results else doc.content)[:100] + "...",
-                    f"{score:.3f}",
-                    "⚡ Cache" if cached_results else "🔍 New"
-                ))
-            
-            # Update metrics
-            latency = int((time.time() - start_time) * 1000)
-            self.query_time_var.set(f"Latency: {latency}ms")
-            self.update_cache_metrics()
-            
-            self.status_var.set(f"Found {len(results)} results ({source})")
-            
-        except Exception as e:
-            self.status_var.set(f"Error: {str(e)}")
-            messagebox.showerror("Search Error", str(e))
+        # Not held to the engine's concurrency limit while it waits on the model;
+        # superseded searches are cancelled, so few are ever in flight
+        self.search_future = future = self.engine.submit(
+            self.engine.cached_search(
+                query,
+                self.encode_query,
+                namespace=MODEL_NAME,
+                index=AI_INDEX,
+                ef_runtime=ef_runtime,
+                field=self.vector_index.field(),
+                codec=self.vector_index.codec(),
+                use_cache=self.cache_enabled.get(),
+                threshold=self.cache_threshold
+            ),
+            callback=lambda result: self.show_results(future, start_time, result),
+            errback=lambda e: self.on_search_error(future, e, typed),
+            limited=False
+        )
 
-    def get_query_hash(self, query):
-        """Generate consistent hash for query caching"""
-        return str(abs(hash(query)))[:10]
+    def encode_query(self, query):
+        """Embed a query as FLOAT32 bytes (runs on the engine's encode workers)"""
+        return self.embeddings.encode(query).tobytes()
+
+    def show_results(self, future, start_time, result):
+        """Display search results and latency unless a newer search superseded them"""
+        if future is not self.search_future:
+            return
+        self.search_future = None
+        
+        source, results, similarity = result
+        self.tree.delete(*self.tree.get_children())
+        for doc in results:
+            self.tree.insert("", "end", values=(
+                doc['id'],
+                doc['title'],
+                doc['content'][:100] + "...",
+                f"{float(doc['score']):.3f}",
+                f"⚡ Cache ({similarity:.2f})" if source == "cache" else "🔍 New"
+            ))
+        
+        # Update metrics
+        REGISTRY.operation("semantic_search", time.time() - start_time)
+        latency = int((time.time() - start_time) * 1000)
+        self.query_time_var.set(f"Latency: {latency}ms")
+        self.update_cache_metrics()
+        
+        self.status_var.set(f"Found {len(results)} results ({source})")
+
+    def on_search_error(self, future, error, typed=False):
+        """Report a failed search unless it was superseded; typed searches only in the status bar"""
+        if future is not self.search_future:
+            return
+        self.search_future = None
+        self.searched_query = None
+        self.status_var.set(f"Error: {str(error)}")
+        if not typed:
+            messagebox.showerror("Search Error", str(error))
 
     def toggle_cache(self):
         """Enable/disable semantic caching"""
@@ -330,38 +741,107 @@ class AIRecommendationApp:
 
     def clear_cache(self):
         """Clear all cached queries"""
-        keys = self.redis.keys("cache:query:*")
-        if keys:
-            self.redis.delete(*keys)
-        self.redis.set("cache:hits", 0)
-        self.redis.set("cache:misses", 0)
-        self.update_cache_metrics()
-        self.status_var.set("Cleared all cached queries")
+        def cleared(count):
+            self.update_cache_metrics()
+            self.status_var.set(f"Cleared {count} cached queries")
+        
+        self.engine.submit(
+            self.engine.clear_query_cache(),
+            callback=cleared,
+            errback=lambda e: self.status_var.set(f"Error: {str(e)}")
+        )
 
     def update_cache_metrics(self):
         """Update cache performance metrics"""
-        hits = int(self.redis.get("cache:hits") or 0)
-        misses = int(self.redis.get("cache:misses") or 0)
+        self.engine.submit(self.engine.cache_metrics(), callback=self.show_cache_metrics)
+
+    def show_cache_metrics(self, metrics):
+        hits, misses = metrics
         total = hits + misses
         ratio = (hits / total * 100) if total > 0 else 0
         self.cache_hits_var.set(f"Cache: {hits}/{total} ({ratio:.1f}% hit rate)")
 
     def start_performance_monitor(self):
-        """Background thread for real-time metrics"""
-        def monitor():
-            while True:
-                try:
-                    self.update_cache_metrics()
-                    time.sleep(2)
-                except Exception as e:
-                    print(f"Monitor error: {str(e)}")
+        """Run engine callbacks every frame and refresh metrics periodically"""
+        def on_frame():
+            try:
+                with REGISTRY.time("ui_frame"):
+                    self.engine.drain_callbacks()
+            except Exception as e:
+                print(f"UI frame error: {str(e)}")
+            finally:
+                self.root.after(UI_FRAME_MS, on_frame)
+        
+        def refresh_metrics():
+            self.update_cache_metrics()
+            self.metrics_var.set(f"{REGISTRY.summary(METRICS_SUMMARY)} | {self.embeddings.summary()}")
+            self.root.after(METRICS_INTERVAL_MS, refresh_metrics)
         
-        threading.Thread(target=monitor, daemon=True).start()
+        on_frame()
+        refresh_metrics()
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="AI Recommendation Engine")
+    parser.add_argument("--metrics-file", metavar="PATH",
+                        help="periodically write Prometheus latency metrics to this file")
+    parser.add_argument("--metrics-port", type=int,
+                        help="serve Prometheus latency metrics on localhost:PORT/metrics")
+    parser.add_argument("--cache-threshold", type=float, default=QUERY_CACHE_THRESHOLD,
+                        help="cosine similarity at which a cached query's results are reused "
+                             f"(default: {QUERY_CACHE_THRESHOLD})")
+    parser.add_argument("--ingest", metavar="PATH",
+                        help="ingest a .jsonl or .csv corpus (id, title, content) instead of starting the UI")
+    parser.add_argument("--batch-size", type=int, default=512,
+                        help="documents per ingest batch (default: 512)")
+    parser.add_argument("--rebuild-index", choices=VECTOR_ALGORITHMS, metavar="ALGORITHM",
+                        help="rebuild ai_index as FLAT or HNSW behind its alias, without interrupting searches, and exit")
+    parser.add_argument("--hnsw-m", type=int, default=HNSW_M,
+                        help=f"HNSW graph degree for --rebuild-index (default: {HNSW_M})")
+    parser.add_argument("--hnsw-ef-construction", type=int, default=HNSW_EF_CONSTRUCTION,
+                        help=f"HNSW build-time candidate list size for --rebuild-index (default: {HNSW_EF_CONSTRUCTION})")
+    parser.add_argument("--ef-runtime", type=int, default=HNSW_EF_RUNTIME,
+                        help=f"default HNSW query-time candidate list size for --rebuild-index (default: {HNSW_EF_RUNTIME})")
+    parser.add_argument("--vector-type", choices=VECTOR_TYPES, type=str.upper,
+                        help="store and index vectors as FLOAT32, FLOAT16 or INT8 with --rebuild-index "
+                             "(default: keep the current type)")
+    parser.add_argument("--host", default=SETTINGS.host,
+                        help="Redis host, or any cluster node with --cluster (default: $REDIS_HOST or localhost)")
+    parser.add_argument("--port", type=int, default=SETTINGS.port,
+                        help="Redis port (default: $REDIS_PORT or 6379)")
+    parser.add_argument("--cluster", action="store_true", default=SETTINGS.cluster,
+                        help="connect to a Redis Cluster (default: $REDIS_CLUSTER)")
+    args = parser.parse_args()
+    
+    SETTINGS.host = args.host
+    SETTINGS.port = args.port
+    SETTINGS.cluster = args.cluster
+    
+    REGISTRY.app = "ai_recommendation"
+    REGISTRY.start_exporter(path=args.metrics_file, port=args.metrics_port)
+    
+    if args.rebuild_index:
+        redis_client = SETTINGS.connect()
+        rebuild_index(redis_client, VectorIndexSettings(
+            args.rebuild_index,
+            m=args.hnsw_m,
+            ef_construction=args.hnsw_ef_construction,
+            ef_runtime=args.ef_runtime,
+            vector_type=args.vector_type or VectorIndexSettings.load(redis_client).vector_type
+        ), raw_client=SETTINGS.connect(decode_responses=False))
+        ensure_indexes(redis_client)
+        raise SystemExit
+    
+    if args.ingest:
+        redis_client = SETTINGS.connect()
+        vector_index = ensure_indexes(redis_client)
+        CorpusIngestor(
+            redis_client, SentenceTransformer(MODEL_NAME), vector_index, batch_size=args.batch_size
+        ).ingest_file(args.ingest)
+        raise SystemExit
+    
     root = tk.Tk()
     try:
-        app = AIRecommendationApp(root)
+        app = AIRecommendationApp(root, cache_threshold=args.cache_threshold)
         root.mainloop()
     except Exception as e:
         messagebox.showerror("Startup Error", f"Application failed to start:\n{str(e)}")
\ No newline at end of file
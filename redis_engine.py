@@ -0,0 +1,1036 @@
+# redis_engine.py - Headless asyncio data-access engine shared by both apps
+import asyncio
+import base64
+import functools
+import hashlib
+import json
+import os
+import queue
+import re
+import threading
+import time
+import uuid
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from redis import Redis as SyncRedis
+from redis.asyncio import Redis, ConnectionPool
+from redis.asyncio.cluster import RedisCluster
+from redis.cluster import RedisCluster as SyncRedisCluster
+from redis.crc import key_slot
+from redis.commands.search import AsyncSearch, reducers
+from redis.commands.search.aggregation import AggregateRequest, Asc
+from redis.commands.search.field import TagField, TextField, VectorField
+from redis.commands.search.indexDefinition import IndexDefinition, IndexType
+from redis.commands.search.query import Query
+from metrics import REGISTRY, instrument_redis
+from vector_codec import RERANK_FACTOR
+
+# Orders are submitted to ORDER_STREAM, or to one of its shards when sharded
+ORDER_STREAM = "orders"
+
+# Status of processed orders, written by the order processor
+ORDER_STATUS_STREAM = "order_status"
+
+# system_log is trimmed to roughly this many entries
+SYSTEM_LOG_STREAM = "system_log"
+SYSTEM_LOG_MAXLEN = 100000
+
+# Hash whose version field is bumped by every catalog write, so a snapshot
+# taken at one version is known to be current while the version is unchanged
+CATALOG_VERSION_KEY = "system:catalog_version"
+
+def bump_catalog_version(pipe):
+    pipe.hincrby(CATALOG_VERSION_KEY, "version", 1)
+
+# Sales analytics: units sold per product in per-minute sorted sets, plus a
+# rolling sorted set of the last SALES_ROLLING_MINUTES that each order adds to
+# and that minutes leaving the window are subtracted from. Every sales key
+# carries the {sales} hash tag, so the scripts over them stay in one cluster slot.
+SALES_ROLLING_MINUTES = 60
+SALES_ROLLING_KEY = "{sales}:last_hour"
+SALES_ROLLED_KEY = "{sales}:last_hour:rolled_through"
+SALES_MINUTE_PREFIX = "{sales}:minute:"
+
+# A minute bucket is subtracted at most two windows after it was written
+SALES_MINUTE_TTL = 2 * SALES_ROLLING_MINUTES * 60
+
+# An order's recorded marker only has to outlive its redelivery; orders left
+# unacknowledged are reclaimed by XAUTOCLAIM after the processors' claim idle time
+SALES_RECORDED_TTL = 600
+
+def sales_minute_key(minute):
+    return f"{SALES_MINUTE_PREFIX}{minute}"
+
+def sales_recorded_key(order_id):
+    return f"{{sales}}:recorded:{order_id}"
+
+# Lua shared by the sales scripts: subtract the minute buckets that have left
+# the window from the rolling set. The rolled-through key holds the newest
+# minute already subtracted. The bucket keys are built from their prefix; they
+# share the {sales} hash tag and so the slot of the declared keys. The current
+# minute comes from the server clock, so processes with skewed clocks agree.
+SALES_ROLL_LUA = """
+local function roll_sales(rolling, rolled_key, prefix, window)
+    local time = redis.call('TIME')
+    local current = math.floor(tonumber(time[1]) / 60)
+    local oldest = current - window
+    local rolled = tonumber(redis.call('GET', rolled_key))
+    if rolled and oldest <= rolled then
+        return current
+    end
+    -- The rolling set only holds minutes in (rolled, rolled + window]
+    if not rolled or oldest - rolled >= window then
+        redis.call('DEL', rolling)
+    else
+        for minute = rolled + 1, oldest do
+            local bucket = redis.call('ZRANGE', prefix .. minute, 0, -1, 'WITHSCORES')
+            for i = 1, #bucket, 2 do
+                if tonumber(redis.call('ZINCRBY', rolling, -bucket[i + 1], bucket[i])) <= 0 then
+                    redis.call('ZREM', rolling, bucket[i])
+                end
+            end
+        end
+    end
+    redis.call('SET', rolled_key, oldest)
+    return current
+end
+"""
+
+# Add an order's units to the current minute bucket and the rolling set once
+# per order. KEYS[1] is the order's recorded marker, KEYS[2]/KEYS[3] the
+# rolling set and its rolled-through key; ARGV[1..4] are the marker TTL, the
+# bucket TTL, the window in minutes and the bucket key prefix, followed by
+# pid, quantity pairs. A redelivered order finds the marker and adds nothing.
+RECORD_SALES_SCRIPT = SALES_ROLL_LUA + """
+if not redis.call('SET', KEYS[1], 1, 'NX', 'EX', ARGV[1]) then
+    return 0
+end
+local bucket = ARGV[4] .. roll_sales(KEYS[2], KEYS[3], ARGV[4], tonumber(ARGV[3]))
+for i = 5, #ARGV, 2 do
+    redis.call('ZINCRBY', bucket, ARGV[i + 1], ARGV[i])
+    redis.call('ZINCRBY', KEYS[2], ARGV[i + 1], ARGV[i])
+end
+redis.call('EXPIRE', bucket, ARGV[2])
+return 1
+"""
+
+# Bring the rolling set up to date and return its top ARGV[3] members with
+# scores. KEYS and ARGV[1..2] are as in RECORD_SALES_SCRIPT minus the marker.
+TOP_SELLERS_SCRIPT = SALES_ROLL_LUA + """
+roll_sales(KEYS[1], KEYS[2], ARGV[2], tonumber(ARGV[1]))
+return redis.call('ZREVRANGE', KEYS[1], 0, tonumber(ARGV[3]) - 1, 'WITHSCORES')
+"""
+
+def record_sales(pipe, order_id, lines, ttl=SALES_RECORDED_TTL):
+    """Queue adding a fulfilled order's (pid, quantity) lines to the sales counters"""
+    args = [ttl, SALES_MINUTE_TTL, SALES_ROLLING_MINUTES, SALES_MINUTE_PREFIX]
+    for pid, quantity in lines:
+        args += [pid, quantity]
+    # Raw EVAL: a pipeline cannot fall back from EVALSHA, and redis-py's
+    # cluster pipeline refuses eval() but routes this by the keys' slot
+    pipe.execute_command(
+        "EVAL", RECORD_SALES_SCRIPT, 3,
+        sales_recorded_key(order_id), SALES_ROLLING_KEY, SALES_ROLLED_KEY,
+        *args
+    )
+
+# Product search: page size, sortable fields and price facet bucket width
+SEARCH_PAGE_SIZE = 50
+SEARCH_SORT_FIELDS = ("price", "inventory")
+PRICE_FACET_WIDTH = 50
+
+# FT.SUGADD dictionary of product names, with the product id as payload. Several
+# products can share a name, so a hash counts the products per name and a
+# name's suggestion is only deleted with its last product. The hash tag keeps
+# both keys in one cluster slot for the script below.
+SUGGEST_KEY = "products:{suggest}"
+SUGGEST_REFS_KEY = "products:{suggest}:refs"
+SUGGEST_COUNT = 8
+
+# Lua shared by the scripts that rename products: move pid's suggestion from
+# old to new (either may be empty) in the dictionary and its per-name counts.
+MOVE_SUGGESTION_LUA = """
+local function move_suggestion(dictionary, refs, old, new, pid)
+    if old == new then
+        return
+    end
+    if old ~= '' then
+        if redis.call('HINCRBY', refs, old, -1) <= 0 then
+            redis.call('HDEL', refs, old)
+            redis.call('FT.SUGDEL', dictionary, old)
+        end
+    end
+    if new ~= '' then
+        redis.call('HINCRBY', refs, new, 1)
+        redis.call('FT.SUGADD', dictionary, new, 1, 'PAYLOAD', pid)
+    end
+end
+"""
+
+# Move one product's suggestion from ARGV[1] to ARGV[2] (either may be empty);
+# ARGV[3] is the product id stored as the payload.
+UPDATE_SUGGESTION_SCRIPT = MOVE_SUGGESTION_LUA + """
+move_suggestion(KEYS[1], KEYS[2], ARGV[1], ARGV[2], ARGV[3])
+return 1
+"""
+
+# Set product fields only if the product exists, then publish ARGV[3] on
+# inventory_updates unless it is empty. KEYS[1] is the product document,
+# ARGV[1] a JSON object of field -> value and ARGV[2] the product id. When
+# KEYS[2..4] (catalog version, suggestion dictionary and counts) are given,
+# the version is bumped and a renamed product's suggestion moved as well.
+# Returns the name before the update, or nil (and writes nothing) when the
+# product is missing.
+UPDATE_PRODUCT_SCRIPT = MOVE_SUGGESTION_LUA + """
+local name = redis.call('JSON.GET', KEYS[1], '$.name')
+if not name then
+    return false
+end
+local old_name = cjson.decode(name)[1] or ''
+local updates = cjson.decode(ARGV[1])
+for field, value in pairs(updates) do
+    redis.call('JSON.SET', KEYS[1], '$.' .. field, cjson.encode(value))
+end
+if ARGV[3] ~= '' then
+    redis.call('PUBLISH', 'inventory_updates', ARGV[3])
+end
+if #KEYS > 1 then
+    redis.call('HINCRBY', KEYS[2], 'version', 1)
+    if type(updates['name']) == 'string' then
+        move_suggestion(KEYS[3], KEYS[4], old_name, updates['name'], ARGV[2])
+    end
+end
+return old_name
+"""
+
+def update_suggestion(pipe, pid, old_name, new_name):
+    """Queue moving pid's suggestion from old_name to new_name; None means no name"""
+    if old_name == new_name:
+        return
+    # Raw EVAL: a pipeline cannot fall back from EVALSHA, and redis-py's
+    # cluster pipeline refuses eval() but routes this by the keys' slot
+    pipe.execute_command(
+        "EVAL", UPDATE_SUGGESTION_SCRIPT, 2, SUGGEST_KEY, SUGGEST_REFS_KEY, old_name or "", new_name or "", pid
+    )
+
+# Characters with a meaning in the RediSearch query syntax
+QUERY_SPECIAL_CHARS = re.compile(r"([,.<>{}\[\]\"':;!@#$%^&*()\-+=~|/\\?])")
+
+def escape_query_text(text):
+    """Turn free text into a query matching all of its words literally"""
+    words = [QUERY_SPECIAL_CHARS.sub(r"\\\1", word) for word in text.split()]
+    return " ".join(word for word in words if word) or "*"
+
+def encode_cursor(state):
+    return base64.urlsafe_b64encode(json.dumps(state).encode()).decode()
+
+def decode_cursor(cursor):
+    return json.loads(base64.urlsafe_b64decode(cursor.encode()))
+
+def numeric_range(low, high, exclusive_low=False):
+    """RediSearch numeric range syntax, open-ended where a bound is None"""
+    low = "-inf" if low is None else f"({low}" if exclusive_low else str(low)
+    high = "+inf" if high is None else str(high)
+    return f"[{low} {high}]"
+
+# Connection Settings =======================================
+
+class RedisSettings:
+    """Where to connect (one server or a Redis Cluster) and how orders are sharded"""
+
+    def __init__(self, host="localhost", port=6379, cluster=False, order_shards=1):
+        self.host = host
+        self.port = port
+        self.cluster = cluster
+        self.order_shards = order_shards
+
+    @classmethod
+    def from_env(cls):
+        """Read REDIS_HOST, REDIS_PORT, REDIS_CLUSTER and ORDER_SHARDS"""
+        return cls(
+            host=os.environ.get("REDIS_HOST", "localhost"),
+            port=int(os.environ.get("REDIS_PORT", 6379)),
+            cluster=os.environ.get("REDIS_CLUSTER", "") not in ("", "0", "false"),
+            order_shards=int(os.environ.get("ORDER_SHARDS", 1))
+        )
+
+    def connect(self, metrics=REGISTRY, decode_responses=True):
+        """Synchronous client: Redis, or RedisCluster seeded from host:port"""
+        client_class = SyncRedisCluster if self.cluster else SyncRedis
+        return instrument_redis(client_class(
+            host=self.host,
+            port=self.port,
+            decode_responses=decode_responses,
+            socket_connect_timeout=3
+        ), metrics)
+
+    def order_streams(self):
+        """Every order stream; shards carry distinct hash tags so they spread over the slots"""
+        if self.order_shards <= 1:
+            return [ORDER_STREAM]
+        return [f"{ORDER_STREAM}:{{{shard}}}" for shard in range(self.order_shards)]
+
+    def order_stream(self, order_id):
+        """The stream a given order is submitted to"""
+        streams = self.order_streams()
+        return streams[zlib.crc32(str(order_id).encode()) % len(streams)]
+
+# Shared by everything in the process; the apps' --cluster/--host/--port flags update it
+SETTINGS = RedisSettings.from_env()
+
+def is_cluster(redis_client):
+    return isinstance(redis_client, (SyncRedisCluster, RedisCluster))
+
+def slot_of(key):
+    """Cluster hash slot of a key, honouring {hash tags}"""
+    return key_slot(key.encode())
+
+# Semantic query cache: cached result sets indexed by their query embedding.
+# A lookup is a hit when the nearest cached query is at least this cosine-similar.
+QUERY_CACHE_INDEX = "query_cache_index"
+QUERY_CACHE_PREFIX = "cache:semantic:"
+QUERY_CACHE_THRESHOLD = 0.9
+QUERY_CACHE_TTL = 3600
+
+# Capped stream of lookup similarities, for tuning the threshold
+SIMILARITY_LOG_STREAM = "cache:similarity_log"
+SIMILARITY_LOG_MAXLEN = 10000
+
+def stable_hash(*parts):
+    """Content hash that is the same in every process, unlike hash()"""
+    return hashlib.sha256("\x1f".join(str(part) for part in parts).encode()).hexdigest()
+
+def normalize_query(text):
+    return " ".join(text.lower().split())
+
+def create_query_cache_index(redis_client, dim=384):
+    """Index cached queries by embedding; scope separates model/index/k combinations"""
+    redis_client.ft(QUERY_CACHE_INDEX).create_index(
+        (
+            TagField("scope"),
+            TextField("query"),
+            VectorField("embedding", "FLAT", {
+                "TYPE": "FLOAT32",
+                "DIM": dim,
+                "DISTANCE_METRIC": "COSINE"
+            })
+        ),
+        definition=IndexDefinition(prefix=[QUERY_CACHE_PREFIX], index_type=IndexType.HASH)
+    )
+
+def product_document(name, description, price, inventory, created_at=None):
+    """Build the JSON document stored under product:{pid}"""
+    return {
+        "name": name,
+        "description": description,
+        "price": float(price),
+        "inventory": int(inventory),
+        "created_at": created_at or datetime.now().isoformat()
+    }
+
+class SystemLogWriter:
+    """Buffers system_log events and writes them in pipelined, trimmed batches
+
+    Events are flushed by a background thread when max_batch events are
+    queued or flush_interval seconds have passed. The stream is trimmed
+    approximately, either to maxlen entries or, when max_age is given, to
+    entries younger than max_age seconds (MINID). The buffer itself holds
+    at most max_queue events; the oldest are dropped beyond that.
+    """
+
+    def __init__(self, redis_client, max_batch=100, flush_interval=0.5,
+                 maxlen=SYSTEM_LOG_MAXLEN, max_age=None, max_queue=10000):
+        self.redis = redis_client
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.maxlen = maxlen
+        self.max_age = max_age
+        self.max_queue = max_queue
+        
+        self.buffer = deque()
+        self.condition = threading.Condition()
+        self.closing = False
+        self.flushed = 0
+        self.dropped = 0
+        self.last_flush_ms = 0.0
+        
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def log(self, event):
+        """Queue an event; never blocks on Redis"""
+        with self.condition:
+            if len(self.buffer) >= self.max_queue:
+                self.buffer.popleft()
+                self.dropped += 1
+            self.buffer.append(event)
+            if len(self.buffer) >= self.max_batch:
+                self.condition.notify()
+
+    def stats(self):
+        """Queue depth and flush latency for monitoring"""
+        return {
+            "queue_depth": len(self.buffer),
+            "last_flush_ms": self.last_flush_ms,
+            "flushed": self.flushed,
+            "dropped": self.dropped
+        }
+
+    def close(self):
+        """Flush everything still queued and stop the writer thread"""
+        with self.condition:
+            self.closing = True
+            self.condition.notify()
+        self.thread.join()
+
+    def run(self):
+        while True:
+            with self.condition:
+                if len(self.buffer) < self.max_batch and not self.closing:
+                    self.condition.wait(self.flush_interval)
+                batch = [self.buffer.popleft() for _ in range(min(len(self.buffer), self.max_batch))]
+                done = self.closing and not self.buffer
+            if batch:
+                self.write(batch)
+            if done:
+                return
+
+    def write(self, batch):
+        """Write one batch in a single pipeline"""
+        start = time.perf_counter()
+        trim = {"maxlen": self.maxlen}
+        if self.max_age is not None:
+            trim = {"minid": f"{int((time.time() - self.max_age) * 1000)}-0"}
+        try:
+            with self.redis.pipeline(transaction=False) as pipe:
+                for event in batch:
+                    pipe.xadd(SYSTEM_LOG_STREAM, event, approximate=True, **trim)
+                pipe.execute()
+            self.flushed += len(batch)
+        except Exception as e:
+            # The log is best effort; losing a batch must not stop the writer
+            self.dropped += len(batch)
+            print(f"System log flush failed: {str(e)}")
+        self.last_flush_ms = (time.perf_counter() - start) * 1000
+
+class RedisEngine:
+    """Runs Redis operations on a background asyncio loop with bounded concurrency
+
+    Callers submit coroutines from any thread. Results are handed to callbacks
+    either directly on the loop thread or, when a callback_queue is given,
+    queued for the owner (e.g. a Tk UI) to run with drain_callbacks().
+    """
+
+    def __init__(self, settings=SETTINGS, max_concurrency=16, encode_workers=1,
+                 callback_queue=None, product_cache=None, metrics=REGISTRY):
+        self.settings = settings
+        self.cluster = settings.cluster
+        self.metrics = metrics
+        if self.cluster:
+            # The cluster client keeps a pool per node
+            self.pool = None
+            self.redis = instrument_redis(RedisCluster(
+                host=settings.host,
+                port=settings.port,
+                decode_responses=True,
+                socket_connect_timeout=3,
+                max_connections=max_concurrency * 2
+            ), metrics)
+        else:
+            self.pool = ConnectionPool(
+                host=settings.host,
+                port=settings.port,
+                decode_responses=True,
+                socket_connect_timeout=3,
+                max_connections=max_concurrency * 2
+            )
+            self.redis = instrument_redis(Redis(connection_pool=self.pool), metrics)
+        self.callback_queue = callback_queue
+        
+        # Mutations log through the writer instead of paying for an XADD each
+        self.log_writer = SystemLogWriter(settings.connect(metrics))
+        self.product_cache = product_cache
+        
+        # Model inference is its own stage: a cancelled search's queued encode never runs
+        self.encode_executor = ThreadPoolExecutor(max_workers=encode_workers, thread_name_prefix="engine-encode")
+
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+
+        # The semaphore must be created on the loop it guards
+        self.limit = self.call(self.create_limit(max_concurrency), limited=False)
+
+    async def create_limit(self, max_concurrency):
+        return asyncio.Semaphore(max_concurrency)
+
+    # Scheduling ================================================
+
+    def submit(self, coro, callback=None, errback=None, limited=True):
+        """Schedule an operation; callback gets the result, errback the exception"""
+        future = asyncio.run_coroutine_threadsafe(
+            self.run_limited(coro) if limited else coro,
+            self.loop
+        )
+        if callback or errback:
+            future.add_done_callback(lambda f: self.dispatch(f, callback, errback))
+        return future
+
+    def call(self, coro, timeout=None, limited=True):
+        """Run an operation and block until it completes (for headless callers)"""
+        return self.submit(coro, limited=limited).result(timeout)
+
+    def post(self, handler, *args):
+        """Hand a call to the callback owner's thread"""
+        if self.callback_queue is not None:
+            self.callback_queue.put((handler, args))
+        else:
+            handler(*args)
+
+    def drain_callbacks(self):
+        """Run every queued callback on the calling thread"""
+        while True:
+            try:
+                handler, args = self.callback_queue.get_nowait()
+            except queue.Empty:
+                return
+            # A failing callback must not keep the ones queued behind it from running
+            try:
+                handler(*args)
+            except Exception as e:
+                print(f"Engine callback {getattr(handler, '__name__', handler)} failed: {str(e)}")
+
+    def dispatch(self, future, callback, errback):
+        if future.cancelled():
+            return
+        error = future.exception()
+        if error is None:
+            if callback:
+                self.post(callback, future.result())
+        elif errback:
+            self.post(errback, error)
+        else:
+            print(f"Engine operation failed: {str(error)}")
+
+    async def run_limited(self, coro):
+        async with self.limit:
+            return await coro
+
+    def close(self):
+        """Flush the log, close connections and stop the loop"""
+        self.log_writer.close()
+        self.encode_executor.shutdown(wait=False, cancel_futures=True)
+        if self.cluster:
+            self.call(self.redis.close(), limited=False)
+        else:
+            self.call(self.pool.disconnect(), limited=False)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+
+    # Products ==================================================
+
+    async def get_products(self, pids):
+        """Return {pid: document}, serving what it can from the product cache"""
+        if self.product_cache is not None:
+            found, missing, generation = self.product_cache.lookup(pids)
+        else:
+            found, missing, generation = {}, list(pids), None
+
+        if missing:
+            docs = await self.json_documents([f"product:{pid}" for pid in missing])
+            fetched = {pid: doc[0] for pid, doc in zip(missing, docs) if doc}
+            if self.product_cache is not None:
+                self.product_cache.store(fetched, generation)
+            found.update(fetched)
+        return found
+
+    async def catalog_version(self):
+        """Current catalog version stamp, "<epoch>:<counter>"
+
+        The epoch is created once per dataset, so a flushed and refilled
+        database never matches a stamp taken before the flush.
+        """
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.hsetnx(CATALOG_VERSION_KEY, "epoch", uuid.uuid4().hex)
+            pipe.hmget(CATALOG_VERSION_KEY, "epoch", "version")
+            _, (epoch, version) = await pipe.execute()
+        return f"{epoch}:{version or 0}"
+
+    def ft(self, index="idx"):
+        """RediSearch commands on index for either client
+
+        redis-py's asyncio cluster client has no ft(). Index commands name no
+        key to route by, so on a cluster they go to the default node, which
+        must be able to search across the shards.
+        """
+        search = AsyncSearch(self.redis, index_name=index)
+        if self.cluster:
+            search.execute_command = functools.partial(
+                self.redis.execute_command, target_nodes=RedisCluster.DEFAULT_NODE
+            )
+        return search
+
+    async def json_get(self, key, path="$"):
+        """JSON.GET of path as the decoded list of matches, or None for a missing key"""
+        # A raw command, as redis-py's asyncio cluster client has no json()
+        reply = await self.redis.execute_command("JSON.GET", key, path)
+        return json.loads(reply) if reply else None
+
+    async def json_documents(self, keys):
+        """[doc] or None per key: one JSON.MGET, or pipelined JSON.GETs on a cluster
+
+        JSON.MGET cannot span hash slots, so on a cluster the reads are sent as
+        a pipeline that redis-py splits per node.
+        """
+        if not self.cluster:
+            replies = await self.redis.execute_command("JSON.MGET", *keys, "$")
+        else:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for key in keys:
+                    pipe.execute_command("JSON.GET", key, "$")
+                replies = await pipe.execute()
+        return [json.loads(reply) if reply else None for reply in replies]
+
+    async def get_product(self, pid):
+        """Return a single product document, or None"""
+        return (await self.get_products([pid])).get(pid)
+
+    async def fetch_product_page(self, cursor=0, count=500):
+        """One SCAN step over product:* plus its documents: (next_cursor, [(pid, doc)])
+
+        The cursor is opaque and 0 once the scan is complete. On a cluster it
+        is the engine's scan iterator over every primary, not a SCAN cursor.
+        """
+        if self.cluster:
+            keys_iter = cursor or self.redis.scan_iter(match="product:*", count=count)
+            keys = []
+            async for key in keys_iter:
+                keys.append(key)
+                if len(keys) >= count:
+                    break
+            cursor = keys_iter if len(keys) >= count else 0
+        else:
+            cursor, keys = await self.redis.scan(cursor=cursor, match="product:*", count=count)
+        pids = [key.split(":", 1)[1] for key in keys]
+        docs = await self.get_products(pids) if pids else {}
+        return cursor, [(pid, docs[pid]) for pid in pids if pid in docs]
+
+    def iter_product_pages(self, count=500):
+        """Yield the whole catalog as pages of (pid, doc) to a synchronous caller"""
+        seen = set()
+        cursor = 0
+        while True:
+            cursor, page = self.call(self.fetch_product_page(cursor, count))
+            # SCAN may return a key more than once while the keyspace is rehashing
+            page = [(pid, doc) for pid, doc in page if pid not in seen]
+            seen.update(pid for pid, _ in page)
+            if page:
+                yield page
+            if not cursor:
+                return
+
+    async def search_products(self, text="", min_price=None, max_price=None, in_stock=False,
+                              sort_by=None, ascending=True, cursor=None, page_size=SEARCH_PAGE_SIZE):
+        """Filtered, sorted and paged product search, evaluated entirely in Redis
+
+        Returns (total, [(pid, fields)], next_cursor, facets). next_cursor is
+        None on the last page; pass it back to get the following page with
+        the same filters. Sorted searches page by keyset (the last sort value
+        plus how many rows with that value were already returned), so rows
+        inserted or removed before the cursor do not shift later pages.
+        facets lists (bucket_low, count) price buckets and is only computed
+        for the first page.
+        """
+        if sort_by is not None and sort_by not in SEARCH_SORT_FIELDS:
+            raise ValueError(f"Cannot sort products by {sort_by}")
+        state = decode_cursor(cursor) if cursor else {}
+
+        price_low, price_high = min_price, max_price
+        if sort_by == "price" and "after" in state:
+            if ascending:
+                price_low = state["after"] if price_low is None else max(price_low, state["after"])
+            else:
+                price_high = state["after"] if price_high is None else min(price_high, state["after"])
+        stock_low, stock_high = (1 if in_stock else None), None
+        if sort_by == "inventory" and "after" in state:
+            if ascending:
+                stock_low = state["after"] if stock_low is None else max(stock_low, state["after"])
+            else:
+                stock_high = state["after"]
+
+        terms = escape_query_text(text)
+        filters = []
+        if price_low is not None or price_high is not None:
+            filters.append(f"@price:{numeric_range(price_low, price_high)}")
+        if stock_low is not None or stock_high is not None:
+            filters.append(f"@inventory:{numeric_range(stock_low, stock_high)}")
+        query_string = " ".join(([] if terms == "*" else [terms]) + filters) or "*"
+
+        offset = state.get("skip", 0) if sort_by else state.get("offset", 0)
+        query = Query(query_string).return_fields("name", "price", "inventory").paging(offset, page_size)
+        if sort_by:
+            query = query.sort_by(sort_by, asc=ascending)
+        else:
+            query = query.slop(1)
+
+        with self.metrics.time("search"):
+            if cursor:
+                results = await self.ft("products").search(query)
+                facets = None
+            else:
+                # Facets ignore the price range so the other buckets stay visible
+                facet_query = " ".join(
+                    ([] if terms == "*" else [terms]) +
+                    ([f"@inventory:{numeric_range(1, None)}"] if in_stock else [])
+                ) or "*"
+                results, facets = await asyncio.gather(
+                    self.ft("products").search(query),
+                    self.price_facets(facet_query)
+                )
+
+        products = [
+            (doc.id.split(":", 1)[1], {
+                "name": doc.name,
+                "price": doc.price,
+                "inventory": doc.inventory
+            })
+            for doc in results.docs
+        ]
+        total = state.get("total", results.total)
+
+        next_cursor = None
+        if len(products) == page_size:
+            if sort_by:
+                last = float(products[-1][1][sort_by])
+                ties = 0
+                for _, fields in reversed(products):
+                    if float(fields[sort_by]) != last:
+                        break
+                    ties += 1
+                # A page made only of ties continues the previous run of equal values
+                if ties == len(products) and state.get("after") == last:
+                    ties += state.get("skip", 0)
+                next_cursor = encode_cursor({"after": last, "skip": ties, "total": total})
+            else:
+                next_cursor = encode_cursor({"offset": offset + page_size, "total": total})
+        return total, products, next_cursor, facets
+
+    async def price_facets(self, query_string, width=PRICE_FACET_WIDTH):
+        """FT.AGGREGATE product counts per price bucket as [(bucket_low, count)]"""
+        request = (
+            AggregateRequest(query_string)
+            .apply(bucket=f"floor(@price / {width}) * {width}")
+            .group_by("@bucket", reducers.count().alias("count"))
+            .sort_by(Asc("@bucket"))
+        )
+        result = await self.ft("products").aggregate(request)
+        facets = []
+        for row in result.rows:
+            fields = dict(zip(row[::2], row[1::2]))
+            facets.append((float(fields["bucket"]), int(fields["count"])))
+        return facets
+
+    async def suggest_products(self, prefix, count=SUGGEST_COUNT):
+        """Autocomplete product names from the suggestion dictionary as [(name, pid)]"""
+        with self.metrics.time("suggest"):
+            # FT.SUGGET names its dictionary key, so a cluster routes it by slot
+            suggestions = await AsyncSearch(self.redis).sugget(SUGGEST_KEY, prefix, num=count, with_payloads=True)
+        return [(suggestion.string, suggestion.payload) for suggestion in suggestions]
+
+    async def add_product(self, pid, name, description, price, inventory):
+        """Store product as JSON, which the products index picks up directly"""
+        # Re-adding an existing id replaces its suggestion rather than adding a second
+        old_names = await self.json_get(f"product:{pid}", "$.name")
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.execute_command(
+                "JSON.SET", f"product:{pid}", "$",
+                json.dumps(product_document(name, description, price, inventory))
+            )
+            pipe.incr("system:total_products")
+            bump_catalog_version(pipe)
+            update_suggestion(pipe, pid, old_names[0] if old_names else None, name)
+            await pipe.execute()
+        
+        self.log_writer.log({
+            "event": "product_add",
+            "product_id": pid,
+            "name": name
+        })
+
+    async def update_product(self, pid, updates):
+        """Write only the changed fields of a product, then notify and bump the catalog version
+
+        One script does all of it in one round trip, and nothing is published
+        or bumped for a missing product. A cluster script cannot reach keys in
+        other slots, so there the version bump and suggestion move follow in
+        a second round trip.
+        """
+        key = f"product:{pid}"
+        notification = ""
+        if "inventory" in updates:
+            notification = json.dumps({
+                "product_id": pid,
+                "new_stock": updates["inventory"],
+                "action": "update"
+            })
+        keys = [key] if self.cluster else [key, CATALOG_VERSION_KEY, SUGGEST_KEY, SUGGEST_REFS_KEY]
+
+        # Path-level writes; the JSON index re-indexes the document itself
+        old_name = await self.redis.eval(
+            UPDATE_PRODUCT_SCRIPT, len(keys), *keys, json.dumps(updates), pid, notification
+        )
+        
+        # Never serve the old document from this process, even before Redis notifies us
+        if self.product_cache is not None:
+            self.product_cache.invalidate([pid])
+        if old_name is None:
+            raise ValueError(f"Product {pid} not found")
+
+        if self.cluster:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                bump_catalog_version(pipe)
+                if "name" in updates:
+                    update_suggestion(pipe, pid, old_name, updates["name"])
+                await pipe.execute()
+        
+        self.log_writer.log({
+            "event": "product_update",
+            "product_id": pid,
+            "fields": ",".join(updates)
+        })
+
+    async def delete_product(self, pid):
+        """Remove product from system"""
+        product = await self.get_product(pid)
+
+        async with self.redis.pipeline(transaction=False) as pipe:
+            # Deleting the JSON document also removes it from the index
+            pipe.execute_command("JSON.DEL", f"product:{pid}")
+            pipe.decr("system:total_products")
+            bump_catalog_version(pipe)
+            if product:
+                update_suggestion(pipe, pid, product["name"], None)
+            await pipe.execute()
+
+        if self.product_cache is not None:
+            self.product_cache.invalidate([pid])
+        self.log_writer.log({
+            "event": "product_delete",
+            "product_id": pid,
+            "name": product["name"] if product else "Unknown"
+        })
+
+    # Orders ====================================================
+
+    async def tail_orders(self, last_id=None, count=100):
+        """Order statuses after last_id, oldest first; the newest count when last_id is None"""
+        if last_id is None:
+            entries = await self.redis.xrevrange(ORDER_STATUS_STREAM, "+", "-", count=count)
+            return entries[::-1]
+        
+        reply = await self.redis.xread({ORDER_STATUS_STREAM: last_id}, count=count)
+        return reply[0][1] if reply else []
+
+    async def older_orders(self, before_id, count=50):
+        """Order statuses strictly before before_id, newest first"""
+        return await self.redis.xrevrange(ORDER_STATUS_STREAM, f"({before_id}", "-", count=count)
+
+    # Sales Analytics ===========================================
+
+    async def units_sold(self, pids, minutes=5):
+        """Units sold per product over the last minutes one-minute buckets"""
+        current = int(time.time() // 60)
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for minute in range(current - minutes + 1, current + 1):
+                for pid in pids:
+                    pipe.zscore(sales_minute_key(minute), pid)
+            scores = await pipe.execute()
+
+        totals = dict.fromkeys(pids, 0)
+        for i, score in enumerate(scores):
+            totals[pids[i % len(pids)]] += int(score or 0)
+        return totals
+
+    async def top_sellers(self, count=10):
+        """Best-selling products over the rolling hour as [(pid, units)], highest first"""
+        # The script first subtracts minutes that left the window since the last order
+        reply = await self.redis.eval(
+            TOP_SELLERS_SCRIPT, 2, SALES_ROLLING_KEY, SALES_ROLLED_KEY,
+            SALES_ROLLING_MINUTES, SALES_MINUTE_PREFIX, count
+        )
+        return [(pid, int(float(units))) for pid, units in zip(reply[::2], reply[1::2])]
+
+    async def sales_dashboard(self, count=10, minutes=5, selected=None):
+        """Top sellers over the last hour with each one's units over the last minutes
+
+        Returns (leaders, recent) where leaders is [(pid, units_last_hour)]
+        and recent maps those pids, plus selected if given, to recent units.
+        """
+        leaders = await self.top_sellers(count)
+        pids = [pid for pid, _ in leaders]
+        if selected and selected not in pids:
+            pids.append(selected)
+        recent = await self.units_sold(pids, minutes) if pids else {}
+        return leaders, recent
+
+    # Query Cache ===============================================
+
+    async def knn_search(self, index, vector, k=5, ef_runtime=None, field="embedding", codec=None):
+        """KNN vector search returning id, title, content and score per document
+
+        vector is float32 bytes. ef_runtime sets the HNSW candidate list size
+        for this query; leave it None for FLAT indexes, which reject it. codec
+        (a VectorCodec) describes a reduced-precision field; for INT8 more
+        candidates are fetched and re-ranked against the float query.
+        """
+        limit = k * RERANK_FACTOR if codec and codec.rerank else k
+        params = {"vec": codec.convert(vector) if codec else vector}
+        knn = f"KNN {limit} @{field} $vec"
+        if ef_runtime:
+            params["ef"] = int(ef_runtime)
+            knn += " EF_RUNTIME $ef"
+        with self.metrics.time("knn_search"):
+            results = await self.ft(index).search(
+                Query(f"*=>[{knn} AS score]")
+                .return_fields("id", "title", "content", "score")
+                .dialect(2),
+                params
+            )
+        documents = [{
+            "id": doc.id,
+            "title": doc.title,
+            "content": doc.content,
+            "score": doc.score
+        } for doc in results.docs]
+        if limit == k:
+            return documents
+        
+        with self.metrics.time("rerank"):
+            stored = await self.vector_bytes([doc["id"] for doc in documents], field)
+            rescored = []
+            unscored = []
+            for doc, distance in zip(documents, codec.distances(vector, stored)):
+                if distance is None:
+                    unscored.append(doc)
+                else:
+                    doc["score"] = f"{distance:.6f}"
+                    rescored.append(doc)
+        # Quantized scores are on a different scale, so hits whose vector vanished go last
+        rescored.sort(key=lambda doc: float(doc["score"]))
+        return (rescored + unscored)[:k]
+
+    async def vector_bytes(self, keys, field):
+        """A binary hash field of each key, read without response decoding"""
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for key in keys:
+                pipe.execute_command("HGET", key, field, NEVER_DECODE=True)
+            return await pipe.execute()
+
+    async def cached_search(self, text, encode, namespace="", index="ai_index", k=5, ef_runtime=None,
+                            field="embedding", codec=None, use_cache=True,
+                            threshold=QUERY_CACHE_THRESHOLD, ttl=QUERY_CACHE_TTL):
+        """KNN search behind the semantic query cache: returns (source, results, similarity)
+
+        A query seen before (same normalized text) is answered by key without
+        encoding it. Otherwise its embedding is looked up in the query cache
+        index, and the nearest cached query's results are reused when its
+        cosine similarity reaches threshold. namespace (e.g. the model name)
+        keeps caches of different embedding models apart. encode turns text
+        into float32 vector bytes; it runs on the engine's encode workers so
+        model inference does not stall other operations. Cancelling the
+        search drops its encode if it has not started. Results found with a
+        different ef_runtime or vector precision are cached separately, as
+        their recall differs.
+        """
+        if not use_cache:
+            vector = await self.encode(encode, text)
+            return "database", await self.knn_search(index, vector, k, ef_runtime, field, codec), None
+
+        scope_parts = (namespace, index, k) + ((int(ef_runtime),) if ef_runtime else ())
+        if codec and codec.vector_type != "FLOAT32":
+            scope_parts += (codec.vector_type,)
+        scope = stable_hash(*scope_parts)[:16]
+        cache_key = f"{QUERY_CACHE_PREFIX}{stable_hash(scope, normalize_query(text))}"
+        with self.metrics.time("cache_lookup"):
+            cached = await self.redis.hget(cache_key, "results")
+        if cached:
+            await self.record_lookup(text, text, 1.0, True)
+            return "cache", json.loads(cached), 1.0
+
+        vector = await self.encode(encode, text)
+        with self.metrics.time("cache_lookup"):
+            nearest = await self.ft(QUERY_CACHE_INDEX).search(
+                Query(f"(@scope:{{{scope}}})=>[KNN 1 @embedding $vec AS score]")
+                .return_fields("query", "results", "score")
+                .dialect(2),
+                {"vec": vector}
+            )
+        if nearest.docs:
+            match = nearest.docs[0]
+            # COSINE distance is 1 - cosine similarity
+            similarity = 1 - float(match.score)
+            hit = similarity >= threshold
+            await self.record_lookup(text, match.query, similarity, hit)
+            if hit:
+                return "cache", json.loads(match.results), similarity
+        else:
+            # Nothing cached in this scope yet; still logged so cold lookups are counted
+            await self.record_lookup(text, "", None, False)
+
+        results = await self.knn_search(index, vector, k, ef_runtime, field, codec)
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.hset(cache_key, mapping={
+                "scope": scope,
+                "query": text,
+                "results": json.dumps(results),
+                "embedding": vector
+            })
+            pipe.expire(cache_key, ttl)
+            await pipe.execute()
+        return "database", results, None
+
+    async def record_lookup(self, query, matched_query, similarity, hit):
+        """Count a cache hit or miss and log the similarity that decided it
+
+        similarity is None when the cache held no query to compare with; it
+        is logged as an empty similarity.
+        """
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.incr("cache:hits" if hit else "cache:misses")
+            pipe.xadd(SIMILARITY_LOG_STREAM, {
+                "query": query,
+                "matched_query": matched_query,
+                "similarity": "" if similarity is None else f"{similarity:.4f}",
+                "hit": int(hit)
+            }, maxlen=SIMILARITY_LOG_MAXLEN, approximate=True)
+            await pipe.execute()
+
+    async def encode(self, encode, text):
+        return await asyncio.get_running_loop().run_in_executor(
+            self.encode_executor, self.timed_encode, encode, text
+        )
+
+    def timed_encode(self, encode, text):
+        with self.metrics.time("encode"):
+            return encode(text)
+
+    async def cache_metrics(self):
+        """Return (hits, misses) for the query cache"""
+        # Separate GETs rather than MGET, which cannot span cluster slots
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.get("cache:hits")
+            pipe.get("cache:misses")
+            hits, misses = await pipe.execute()
+        return int(hits or 0), int(misses or 0)
+
+    async def clear_query_cache(self):
+        """Delete every cached query and reset the counters"""
+        keys = [key async for key in self.redis.scan_iter(match=f"{QUERY_CACHE_PREFIX}*", count=500)]
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for key in keys:
+                pipe.unlink(key)
+            pipe.set("cache:hits", 0)
+            pipe.set("cache:misses", 0)
+            await pipe.execute()
+        return len(keys)
@@ -0,0 +1,127 @@
+# snapshot.py - Memory-mapped on-disk snapshots for fast warm starts
+import hashlib
+import json
+import os
+import tempfile
+import numpy as np
+
+# Snapshots are per user and per Redis server, outside the repository
+SNAPSHOT_DIR = os.environ.get(
+    "SNAPSHOT_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "redis-beyond-cache")
+)
+
+# Bumped when the snapshot layout changes; snapshots of other formats are ignored
+SNAPSHOT_FORMAT = 1
+
+def catalog_dtype(pid_width, name_width):
+    """One fixed-width record per product, wide enough for the longest id and name"""
+    return np.dtype([
+        ("pid", f"U{max(pid_width, 1)}"),
+        ("name", f"U{max(name_width, 1)}"),
+        ("price", "f8"),
+        ("inventory", "i8")
+    ])
+
+def write_atomic(path, write):
+    """Write a file through a temporary name so readers never see it half-written
+
+    Each call writes its own temporary file next to path, so concurrent
+    saves cannot clobber each other's half-written data.
+    """
+    directory, name = os.path.split(path)
+    with tempfile.NamedTemporaryFile(dir=directory, prefix=f"{name}.", suffix=".tmp", delete=False) as f:
+        try:
+            write(f)
+        except BaseException:
+            f.close()
+            os.unlink(f.name)
+            raise
+    os.replace(f.name, path)
+
+def content_stamp(*parts):
+    """Stable version stamp for JSON-serializable content"""
+    return hashlib.sha256(json.dumps(parts, sort_keys=True).encode()).hexdigest()
+
+class Snapshot:
+    """A .npy array plus a JSON metadata file holding its version stamp
+
+    source identifies what the snapshot was taken from (e.g. the Redis
+    server); a snapshot of a different source is ignored.
+    """
+
+    def __init__(self, name, source="", directory=SNAPSHOT_DIR):
+        self.source = source
+        self.array_path = os.path.join(directory, f"{name}.npy")
+        self.meta_path = os.path.join(directory, f"{name}.json")
+
+    def load(self):
+        """Return (version, metadata, memory-mapped array), or None if missing or unusable"""
+        try:
+            with open(self.meta_path) as f:
+                meta = json.load(f)
+            if meta.get("source") != self.source or meta.get("format") != SNAPSHOT_FORMAT:
+                return None
+            array = np.load(self.array_path, mmap_mode="r")
+        except (OSError, ValueError):
+            return None
+        # The array is replaced before the metadata; a mismatch means an interrupted save
+        if len(array) != meta.get("count"):
+            return None
+        return meta["version"], meta, array
+
+    def save(self, version, array, **extra):
+        """Replace the snapshot with array, stamped with version"""
+        os.makedirs(os.path.dirname(self.array_path), exist_ok=True)
+        write_atomic(self.array_path, lambda f: np.save(f, array))
+        meta = dict(extra, version=version, source=self.source, count=len(array), format=SNAPSHOT_FORMAT)
+        write_atomic(self.meta_path, lambda f: f.write(json.dumps(meta).encode()))
+
+class CatalogSnapshot(Snapshot):
+    """The product list as last loaded from Redis"""
+
+    def __init__(self, source="", directory=SNAPSHOT_DIR):
+        super().__init__("catalog", source, directory)
+
+    def load_products(self):
+        """Return (version, [(pid, product_data)]), or None"""
+        loaded = self.load()
+        if loaded is None:
+            return None
+        version, meta, records = loaded
+        return version, [
+            (str(record["pid"]), {
+                "name": str(record["name"]),
+                "price": float(record["price"]),
+                "inventory": int(record["inventory"])
+            })
+            for record in records
+        ]
+
+    def save_products(self, version, products):
+        """Snapshot (pid, product_data) pairs"""
+        # Sized from the data: a truncated id would match no product:{pid} key
+        rows = [(str(pid), str(doc["name"]), float(doc["price"]), int(doc["inventory"])) for pid, doc in products]
+        dtype = catalog_dtype(
+            max((len(row[0]) for row in rows), default=1),
+            max((len(row[1]) for row in rows), default=1)
+        )
+        records = np.array(rows, dtype=dtype)
+        self.save(version, records)
+
+class EmbeddingSnapshot(Snapshot):
+    """A float32 embedding matrix with the document ids of its rows"""
+
+    def __init__(self, source="", directory=SNAPSHOT_DIR):
+        super().__init__("embeddings", source, directory)
+
+    def load_embeddings(self, version):
+        """Return ({doc_id: embedding row}) if the snapshot has this version, else None"""
+        loaded = self.load()
+        if loaded is None or loaded[0] != version:
+            return None
+        _, meta, matrix = loaded
+        return dict(zip(meta["ids"], matrix))
+
+    def save_embeddings(self, version, ids, matrix):
+        self.save(version, np.asarray(matrix, dtype=np.float32), ids=list(ids))
@@ -0,0 +1,47 @@
+#!/bin/sh
+# start-cluster.sh - Start or stop a local Redis Cluster for trying cluster mode
+#
+#   ./start-cluster.sh start     # NODES primaries on BASE_PORT.. (default 3 on 7000-7002)
+#   ./start-cluster.sh stop
+#
+# JSON and search commands need the modules loaded on every node, e.g.
+#   MODULE_ARGS="--loadmodule /opt/redis-stack/lib/rejson.so --loadmodule /opt/redis-stack/lib/redisearch.so"
+set -e
+
+NODES=${NODES:-3}
+BASE_PORT=${BASE_PORT:-7000}
+REDIS_SERVER=${REDIS_SERVER:-redis-server}
+REDIS_CLI=${REDIS_CLI:-redis-cli}
+CLUSTER_DIR=${CLUSTER_DIR:-./cluster-data}
+
+case "${1:-start}" in
+start)
+    hosts=""
+    for i in $(seq 0 $((NODES - 1))); do
+        port=$((BASE_PORT + i))
+        mkdir -p "$CLUSTER_DIR/$port"
+        $REDIS_SERVER --port "$port" \
+            --cluster-enabled yes \
+            --cluster-config-file nodes.conf \
+            --dir "$CLUSTER_DIR/$port" \
+            --save "" --appendonly no \
+            --daemonize yes \
+            --logfile redis.log \
+            $MODULE_ARGS
+        hosts="$hosts 127.0.0.1:$port"
+    done
+    sleep 1
+    $REDIS_CLI --cluster create $hosts --cluster-replicas 0 --cluster-yes
+    echo "Cluster ready; connect with --cluster --port $BASE_PORT"
+    ;;
+stop)
+    for i in $(seq 0 $((NODES - 1))); do
+        $REDIS_CLI -p $((BASE_PORT + i)) shutdown nosave || true
+    done
+    rm -rf "$CLUSTER_DIR"
+    ;;
+*)
+    echo "usage: $0 [start|stop]" >&2
+    exit 1
+    ;;
+esac
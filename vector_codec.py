@@ -0,0 +1,62 @@
+# vector_codec.py - Reduced-precision storage for embedding vectors
+import numpy as np
+
+# Element types a vector field can be stored and indexed as
+VECTOR_TYPES = ("FLOAT32", "FLOAT16", "INT8")
+VECTOR_DTYPES = {"FLOAT32": np.float32, "FLOAT16": np.float16, "INT8": np.int8}
+
+# INT8 KNN candidates fetched per requested result for the float re-rank
+RERANK_FACTOR = 4
+
+class VectorCodec:
+    """Converts float32 embeddings to and from a vector field's stored bytes
+
+    FLOAT16 halves and INT8 quarters the bytes per vector. INT8 scales each
+    vector by its largest component; cosine distance ignores that scale, so
+    none is stored. INT8 KNN results are re-ranked against the float query,
+    since scores between two quantized vectors reorder close neighbours.
+    """
+
+    def __init__(self, vector_type="FLOAT32"):
+        self.vector_type = vector_type.upper()
+        if self.vector_type not in VECTOR_TYPES:
+            raise ValueError(f"Unsupported vector type {vector_type}; expected one of {', '.join(VECTOR_TYPES)}")
+        self.dtype = np.dtype(VECTOR_DTYPES[self.vector_type])
+        self.rerank = self.vector_type == "INT8"
+
+    def quantize(self, vectors):
+        """float32 vector(s) in this codec's element type"""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if self.vector_type != "INT8":
+            return vectors.astype(self.dtype)
+        scale = np.max(np.abs(vectors), axis=-1, keepdims=True)
+        scale[scale == 0] = 1
+        return np.round(vectors / scale * 127).astype(np.int8)
+
+    def encode(self, vector):
+        """Stored bytes of one float32 vector"""
+        return self.quantize(vector).tobytes()
+
+    def decode(self, raw):
+        """float32 vector from stored bytes (INT8 comes back scaled, not normalized)"""
+        return np.frombuffer(raw, dtype=self.dtype).astype(np.float32)
+
+    def convert(self, float32_bytes):
+        """Stored bytes for a query vector given as float32 bytes"""
+        return self.encode(np.frombuffer(float32_bytes, dtype=np.float32))
+
+    def bytes_per_vector(self, dim):
+        return dim * self.dtype.itemsize
+
+    def distances(self, float32_bytes, stored):
+        """Cosine distance from a float32 query to each stored vector (None if missing)"""
+        query = np.frombuffer(float32_bytes, dtype=np.float32)
+        query = query / (np.linalg.norm(query) or 1)
+        result = []
+        for raw in stored:
+            if not raw:
+                result.append(None)
+                continue
+            vector = self.decode(raw)
+            result.append(1 - float(vector @ query) / (float(np.linalg.norm(vector)) or 1))
+        return result